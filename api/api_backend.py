@@ -4,27 +4,153 @@ TrocZen API Backend
 Gère l'upload des logos commerçants et la distribution d'APK
 Intégration IPFS pour stockage décentralisé des images
 """
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Request, request, jsonify, send_file, render_template
+from flask.json.provider import JSONProvider, DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import hashlib
+import mmap
+import tempfile
+import weakref
+from email.utils import parsedate_to_datetime
+import ssl
 import json
+import gzip
 from datetime import datetime
 from pathlib import Path
 import qrcode
 from io import BytesIO
+from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import base64
-import asyncio
-import aiohttp
+import atexit
 import threading
+import time
+import itertools
+import random
 import concurrent.futures
+import queue
+from contextlib import ExitStack
+from functools import lru_cache
 
 # Import du module de logging centralisé
+try:
+    import orjson
+except ImportError:  # Optionnel : sérialisation JSON stdlib par défaut
+    orjson = None
+try:
+    import blake3
+except ImportError:  # Optionnel : checksums APK en SHA256 par défaut
+    blake3 = None
+try:
+    import segno
+except ImportError:  # Optionnel : QR codes générés par qrcode/PIL par défaut
+    segno = None
 from logger import setup_logging, get_logger, log_exception, create_api_error_response, format_error_for_log
 
+
+class ORJSONProvider(JSONProvider):
+    """
+    Sérialisation JSON de Flask (jsonify, request.get_json) via orjson,
+    implémenté en C : 3 à 10x plus rapide que le module json standard.
+    Les types non gérés par orjson passent par le fallback de Flask.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Corps en bytes directement : pas d'aller-retour str -> bytes
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=DefaultJSONProvider.default)
+        return self._app.response_class(body, mimetype='application/json')
+
+
+# umask du processus, lu une fois (os.umask ne permet pas de le lire sans le changer)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def _discard_spool(file, path):
+    file.close()
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class UploadSpoolFile:
+    """
+    Fichier reçu en multipart, écrit par le parseur werkzeug directement dans
+    UPLOAD_SPOOL (même système de fichiers que UPLOAD_FOLDER, mais non servi),
+    avec le SHA256 calculé pendant l'écriture : save_upload_stream n'a plus
+    qu'à le renommer. Lecture, seek, etc. sont délégués au fichier sous-jacent.
+    
+    Un fichier jamais renommé (corps tronqué, requête refusée avant
+    l'enregistrement) est supprimé par close() ou, à défaut, quand l'objet
+    est libéré.
+    """
+    
+    def __init__(self):
+        fd, path = tempfile.mkstemp(prefix='.upload-', suffix='.part', dir=UPLOAD_SPOOL)
+        self.path = Path(path)
+        self.file = os.fdopen(fd, 'w+b')
+        self._cleanup = weakref.finalize(self, _discard_spool, self.file, path)
+        self.sha256 = hashlib.sha256()
+        self.buffer = bytearray()
+        self.size = 0
+    
+    def write(self, data):
+        self.size += len(data)
+        self.sha256.update(data)
+        if self.buffer is not None and self.size <= UPLOAD_MEMORY_MAX:
+            self.buffer += data
+        else:
+            self.buffer = None
+        return self.file.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+    
+    def commit(self, filepath):
+        """Renomme le fichier reçu en filepath ; mêmes retours que save_upload_stream"""
+        if self.size > MAX_FILE_SIZE:
+            raise ValueError('File too large')
+        # mkstemp crée le fichier en 0600 : mêmes droits qu'un open() classique,
+        # pour que nginx (X-Accel) puisse le lire
+        os.fchmod(self.file.fileno(), 0o666 & ~_UMASK)
+        self.file.close()
+        os.replace(self.path, filepath)
+        self._cleanup.detach()
+        checksum = self.sha256.hexdigest()
+        return checksum, bytes(self.buffer) if self.buffer is not None else None
+    
+    def close(self):
+        # Appelé en fin de requête : supprime le fichier s'il n'a pas été gardé
+        self.file.close()
+        self._cleanup()
+
+
+class UploadRequest(Request):
+    """Requête Flask dont les fichiers d'upload sont reçus en UploadSpoolFile"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path.startswith('/api/upload/'):
+            return UploadSpoolFile()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
 # ==================== CONFIGURATION LOGGING ====================
@@ -54,21 +180,51 @@ logger = setup_logging(
 # Logger spécifique pour l'application
 app_logger = get_logger('api_backend')
 
+# SHA256 passe par OpenSSL (accéléré SHA-NI / ARMv8 si le CPU le permet) :
+# version tracée au démarrage pour vérifier le backend effectivement lié
+app_logger.info(
+    f"Checksums SHA256 via {ssl.OPENSSL_VERSION} "
+    f"(hashlib.file_digest: {'oui' if hasattr(hashlib, 'file_digest') else 'non, fallback mmap'})"
+)
+
 # Configuration - chemins relatifs au script, pas au CWD
 SCRIPT_DIR = Path(__file__).parent.resolve()
 UPLOAD_FOLDER = SCRIPT_DIR / 'uploads'
+UPLOAD_SPOOL = SCRIPT_DIR / 'uploads_spool'  # Uploads multipart en cours de réception
+FEEDBACK_OUTBOX = SCRIPT_DIR / 'feedback_outbox'
+FEEDBACK_RESULTS = SCRIPT_DIR / 'feedback_results'
 APK_FOLDER = SCRIPT_DIR / 'apks'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'gif'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'webp', 'gif'})
+ALLOWED_EXTENSIONS_LABEL = ', '.join(sorted(ALLOWED_EXTENSIONS))  # Pour les messages d'erreur
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Taille des blocs lus sur le flux d'upload (1MB)
+# Au-delà, le contenu n'est pas gardé en mémoire pour IPFS (relu depuis le disque)
+UPLOAD_MEMORY_MAX = int(os.getenv('UPLOAD_MEMORY_MAX', str(256 * 1024)))  # 256KB
+
+# Au-delà de cette taille, le checksum des APK est une empreinte arbre calculée en parallèle
+TREE_CHECKSUM_MIN_SIZE = int(os.getenv('TREE_CHECKSUM_MIN_SIZE', str(512 * 1024 * 1024)))  # 512MB
+TREE_CHECKSUM_PREFIX = 'tree-sha256-v1:'
+# Algorithme du checksum APK : blake3 (si le module est installé) ou sha256
+APK_CHECKSUM_ALGO = os.getenv('APK_CHECKSUM_ALGO', 'blake3').lower()
 
 # ✅ Configuration IPFS
 IPFS_API_URL = os.getenv('IPFS_API_URL', 'http://127.0.0.1:5001')  # API locale IPFS
 IPFS_GATEWAY = os.getenv('IPFS_GATEWAY', 'https://ipfs.copylaradio.com')  # Passerelle publique
 IPFS_ENABLED = os.getenv('IPFS_ENABLED', 'true').lower() == 'true'
 IPFS_TIMEOUT = int(os.getenv('IPFS_TIMEOUT', '30'))  # Timeout en secondes
+# Attente max des CID dans /api/upload/images, sous le --timeout gunicorn (30 s)
+UPLOAD_BATCH_WAIT = min(IPFS_TIMEOUT, int(os.getenv('UPLOAD_BATCH_WAIT', '15')))
+
+# ✅ Configuration Nostr
+NOSTR_RELAY = os.getenv('NOSTR_RELAY', 'ws://127.0.0.1:7777')  # Relai Strfry local
+NOSTR_ENABLED = os.getenv('NOSTR_ENABLED', 'true').lower() == 'true'
 
 # ✅ Fichier de métadonnées IPFS pour les APK
 APK_IPFS_META_FILE = APK_FOLDER / 'ipfs_meta.json'
+APK_LATEST_LINK = APK_FOLDER / 'latest.apk'  # Lien symbolique posé par build_apk.sh
+UPLOAD_CACHE_MAX_AGE = int(os.getenv('UPLOAD_CACHE_MAX_AGE', '86400'))  # Cache client des images (secondes)
+APK_CACHE_MAX_AGE = int(os.getenv('APK_CACHE_MAX_AGE', '60'))  # Cache client des APK (secondes)
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '30'))  # Durée de vie des pages HTML rendues (secondes)
 
 # ✅ Configuration TrocZen Box
 MARKET_SEED = os.getenv('MARKET_SEED', '0000000000000000000000000000000000000000000000000000000000000000')  # Seed du marché (64 chars hex)
@@ -77,27 +233,81 @@ WIFI_SSID = os.getenv('WIFI_SSID', 'ZEN-Box')  # SSID WiFi de la Box
 WIFI_PASSWORD = os.getenv('WIFI_PASSWORD', '0penS0urce!')  # Mot de passe WiFi
 BOX_IP = os.getenv('BOX_IP', '10.42.0.1')  # IP locale de la Box
 
+# ✅ Délégation de l'envoi des fichiers à nginx (X-Accel-Redirect)
+USE_XACCEL = os.getenv('USE_XACCEL', 'false').lower() == 'true'
+XACCEL_UPLOADS_PREFIX = os.getenv('XACCEL_UPLOADS_PREFIX', '/internal_uploads')
+XACCEL_APKS_PREFIX = os.getenv('XACCEL_APKS_PREFIX', '/internal_apks')
+# Variante Apache (mod_xsendfile) : send_file() émet alors l'en-tête X-Sendfile
+USE_XSENDFILE = os.getenv('USE_XSENDFILE', 'false').lower() == 'true'
+
 # Pool de threads pour les uploads IPFS asynchrones
-IPFS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='ipfs_upload')
+# 2-3 requêtes /api/v0/add simultanées suffisent à saturer un nœud Kubo
+IPFS_MAX_WORKERS = int(os.getenv('IPFS_MAX_WORKERS', '3'))
+IPFS_QUEUE_SIZE = int(os.getenv('IPFS_QUEUE_SIZE', '128'))  # Uploads en attente max, au-delà: 503
+IPFS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=IPFS_MAX_WORKERS, thread_name_prefix='ipfs_upload')
+
+# Regroupement des uploads IPFS : un seul /api/v0/add multi-fichiers par lot
+IPFS_BATCH_MAX = int(os.getenv('IPFS_BATCH_MAX', '16'))  # Fichiers max par requête
+IPFS_BATCH_FLUSH_MS = int(os.getenv('IPFS_BATCH_FLUSH_MS', '200'))  # Attente max avant envoi du lot
+
+# Session HTTP partagée pour l'API IPFS (connexions keep-alive réutilisées).
+# Un seul hôte (le nœud Kubo) : un pool, dimensionné pour garder ouverte une
+# connexion par thread d'upload /api/v0/add, plus les sondes /api/v0/id
+IPFS_SESSION = requests.Session()
+IPFS_SESSION.mount('http://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=IPFS_MAX_WORKERS + 8,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# Configuration GitHub (feedback)
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+# Pool de tokens (GITHUB_TOKENS=tok1,tok2,...) : quotas GitHub additionnés
+GITHUB_TOKENS = [t.strip() for t in os.getenv('GITHUB_TOKENS', GITHUB_TOKEN or '').split(',') if t.strip()]
+GITHUB_REPO = os.getenv('GITHUB_REPO', 'papiche/troczen')
+GITHUB_ISSUES_URL = f'https://api.github.com/repos/{GITHUB_REPO}/issues'
+
+# Session HTTPS partagée pour l'API GitHub (TLS réutilisé entre feedbacks).
+# Aucun nouvel essai ici : chaque essai coûterait jusqu'à 13 s de plus dans la
+# requête, et l'outbox renvoie déjà les feedbacks en échec (réseau, 5xx).
+GITHUB_SESSION = requests.Session()
+GITHUB_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20
+))
+GITHUB_SESSION.headers.update({'Accept': 'application/vnd.github.v3+json'})
 
 # Créer les dossiers
 UPLOAD_FOLDER.mkdir(exist_ok=True)
+UPLOAD_SPOOL.mkdir(exist_ok=True)
 APK_FOLDER.mkdir(exist_ok=True)
+FEEDBACK_OUTBOX.mkdir(exist_ok=True)
+FEEDBACK_RESULTS.mkdir(exist_ok=True)
+
+# Restes d'uploads d'un worker tué en cours de réception (ceux de moins d'une
+# heure peuvent appartenir à un autre worker encore actif)
+for _stale in UPLOAD_SPOOL.glob('.upload-*.part'):
+    try:
+        if _stale.stat().st_mtime < time.time() - 3600:
+            _stale.unlink()
+    except OSError:
+        pass
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['APK_FOLDER'] = APK_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+app.config['USE_X_SENDFILE'] = USE_XSENDFILE
 
 
 # ==================== VALIDATION MIME MAGIC BYTES ====================
 
-# Magic bytes pour les types MIME autorisés
-MAGIC_BYTES = {
-    'png': [b'\x89PNG\r\n\x1a\n'],   # Signature PNG
-    'jpg': [b'\xFF\xD8\xFF'],         # Signature JPEG
-    'jpeg': [b'\xFF\xD8\xFF'],        # Même que JPG
-    'webp': [b'RIFF', b'WEBP'],       # WEBP commence par "RIFF" et contient "WEBP" à l'offset 8
-    'gif': [b'GIF87a', b'GIF89a'],     # Signature GIF : commence par "GIF87a" ou "GIF89a"
+# Magic bytes pour les types MIME autorisés, indexés par les 3 premiers octets :
+# préfixe -> (extensions acceptées, signatures complètes possibles)
+MAGIC_BYTES_LUT = {
+    b'\x89PN': (frozenset({'png'}), (b'\x89PNG\r\n\x1a\n',)),        # Signature PNG
+    b'\xFF\xD8\xFF': (frozenset({'jpg', 'jpeg'}), (b'\xFF\xD8\xFF',)),  # Signature JPEG
+    b'RIF': (frozenset({'webp'}), (b'RIFF',)),                         # WEBP : "RIFF" puis "WEBP" à l'offset 8
+    b'GIF': (frozenset({'gif'}), (b'GIF87a', b'GIF89a')),              # Signature GIF
 }
 
 # Mapping extension -> MIME type
@@ -114,32 +324,26 @@ def validate_magic_bytes(file_content: bytes, extension: str) -> bool:
     """
     Valide les magic bytes d'un fichier pour s'assurer qu'il correspond à son extension.
     
+    Une seule recherche dans MAGIC_BYTES_LUT, puis un startswith() sur un
+    tuple de signatures (boucle en C).
+    
     Args:
         file_content: Les premiers bytes du fichier (au moins 12 bytes)
-        extension: L'extension du fichier (sans le point)
+        extension: L'extension du fichier (sans le point, en minuscules)
         
     Returns:
         True si les magic bytes correspondent à l'extension, False sinon
     """
-    ext = extension.lower()
-    
-    if ext not in MAGIC_BYTES:
+    entry = MAGIC_BYTES_LUT.get(file_content[:3])
+    if entry is None:
         return False
     
-    magic_signatures = MAGIC_BYTES[ext]
-    
-    # Pour WEBP, vérifier RIFF au début et WEBP à l'offset 8
-    if ext == 'webp':
-        if len(file_content) < 12:
-            return False
-        return file_content[:4] == b'RIFF' and file_content[8:12] == b'WEBP'
-    
-    # Pour les autres formats, vérifier si le contenu commence par un des magic bytes
-    for signature in magic_signatures:
-        if file_content.startswith(signature):
-            return True
+    extensions, signatures = entry
+    if extension not in extensions or not file_content.startswith(signatures):
+        return False
     
-    return False
+    # Pour WEBP, vérifier aussi WEBP à l'offset 8
+    return extension != 'webp' or file_content[8:12] == b'WEBP'
 
 
 def allowed_file(filename, file_content: bytes = None) -> tuple:
@@ -153,13 +357,14 @@ def allowed_file(filename, file_content: bytes = None) -> tuple:
     Returns:
         Tuple (is_valid, error_message)
     """
-    if '.' not in filename:
+    _, dot, extension = filename.rpartition('.')
+    if not dot:
         return False, "Le fichier n'a pas d'extension"
     
-    extension = filename.rsplit('.', 1)[1].lower()
+    extension = extension.lower()
     
     if extension not in ALLOWED_EXTENSIONS:
-        return False, f"Extension '{extension}' non autorisée. Extensions autorisées: {', '.join(ALLOWED_EXTENSIONS)}"
+        return False, f"Extension '{extension}' non autorisée. Extensions autorisées: {ALLOWED_EXTENSIONS_LABEL}"
     
     # Si le contenu est fourni, valider les magic bytes
     if file_content is not None:
@@ -173,28 +378,193 @@ def allowed_file(filename, file_content: bytes = None) -> tuple:
 
 
 def generate_checksum(filepath):
-    """Générer SHA256 checksum"""
-    sha256_hash = hashlib.sha256()
+    """
+    Générer SHA256 checksum.
+
+    La boucle lecture/hachage s'exécute entièrement en C : hashlib.file_digest
+    (Python 3.11+) ou, à défaut, un mmap passé en une fois à sha256.update().
+    """
     with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+
+        sha256_hash = hashlib.sha256()
+        # mmap refuse les fichiers vides
+        if os.fstat(f.fileno()).st_size == 0:
+            return sha256_hash.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            sha256_hash.update(mm)
     return sha256_hash.hexdigest()
 
 
+def _slice_sha256(filepath, offset, length):
+    """SHA256 d'une tranche [offset, offset + length) du fichier (exécuté dans un thread)"""
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=offset) as mm:
+            return hashlib.sha256(mm).digest()
+
+
+def generate_tree_checksum(filepath):
+    """
+    Empreinte "arbre" pour les très gros fichiers : le fichier est découpé en
+    tranches hachées en parallèle (un thread par cœur), puis on hache la
+    concaténation des empreintes des tranches.
+
+    Des threads et non des processus : sha256 relâche le GIL pendant le
+    hachage, et un fork depuis un worker gunicorn gevent n'est pas sûr.
+
+    Ce n'est PAS le SHA256 du fichier : le résultat est préfixé par
+    TREE_CHECKSUM_PREFIX pour que les clients puissent le distinguer.
+    """
+    size = os.path.getsize(filepath)
+    workers = os.cpu_count() or 1
+
+    # Les offsets mmap doivent être alignés sur ALLOCATIONGRANULARITY
+    granularity = mmap.ALLOCATIONGRANULARITY
+    slice_size = -(-size // workers)
+    slice_size = max(granularity, -(-slice_size // granularity) * granularity)
+    offsets = range(0, size, slice_size)
+    lengths = [min(slice_size, size - off) for off in offsets]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(lengths)),
+                                               thread_name_prefix='tree_checksum') as executor:
+        parts = executor.map(_slice_sha256, [str(filepath)] * len(lengths), offsets, lengths)
+        digest = hashlib.sha256(b''.join(parts)).hexdigest()
+
+    return f"{TREE_CHECKSUM_PREFIX}{digest}"
+
+
+def generate_blake3_checksum(filepath):
+    """
+    Checksum BLAKE3 (vectorisé SIMD et multi-thread, plusieurs fois plus
+    rapide que SHA256), préfixé 'blake3:' pour que les clients le distinguent.
+    """
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    hasher.update_mmap(filepath)
+    return f"blake3:{hasher.hexdigest()}"
+
+
+def generate_apk_checksum(filepath):
+    """
+    Checksum d'un APK (intégrité du téléchargement, pas un engagement
+    cryptographique) : BLAKE3 si disponible, sinon SHA256 classique ou
+    empreinte arbre parallèle au-delà de TREE_CHECKSUM_MIN_SIZE.
+    """
+    if blake3 is not None and APK_CHECKSUM_ALGO == 'blake3':
+        return generate_blake3_checksum(filepath)
+    if os.path.getsize(filepath) >= TREE_CHECKSUM_MIN_SIZE:
+        return generate_tree_checksum(filepath)
+    return generate_checksum(filepath)
+
+
+def load_apk_checksum(filepath):
+    """
+    Checksum d'un APK persisté dans <apk>.checksum : calculé une seule fois
+    par version, puis partagé entre workers gunicorn et redémarrages.
+    Le fichier contient "<checksum> <mtime_ns> <taille>" de l'APK haché : il
+    est ignoré si l'APK a changé depuis (même réécrit sur place) ou s'il est
+    d'un autre algorithme que celui configuré.
+    """
+    filepath = Path(filepath)
+    sidecar = filepath.with_name(filepath.name + '.checksum')
+    want_blake3 = blake3 is not None and APK_CHECKSUM_ALGO == 'blake3'
+    st = filepath.stat()
+    try:
+        checksum, mtime_ns, size = sidecar.read_text().split()
+        if ((int(mtime_ns), int(size)) == (st.st_mtime_ns, st.st_size)
+                and checksum.startswith('blake3:') == want_blake3):
+            return checksum
+    except (OSError, ValueError):
+        pass
+    
+    checksum = generate_apk_checksum(filepath)
+    
+    # Écriture atomique (un autre worker peut le lire en même temps)
+    try:
+        tmp_path = sidecar.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(f'{checksum} {st.st_mtime_ns} {st.st_size}\n')
+        os.replace(tmp_path, sidecar)
+    except OSError as e:
+        app_logger.warning(f'Checksum APK non persisté: {e}')
+    return checksum
+
+
+# Cache des checksums : (chemin, mtime_ns, taille) -> sha256
+# Une modification du fichier change la clé, l'invalidation est donc automatique.
+_CHECKSUM_CACHE = {}
+_CHECKSUM_CACHE_MAX = 64
+_CHECKSUM_CACHE_LOCK = threading.Lock()
+
+
+def get_cached_checksum(filepath, hasher=generate_checksum):
+    """
+    Retourne le checksum d'un fichier, mémorisé par (chemin, mtime, taille).
+    Évite de re-hacher un APK de plusieurs dizaines de Mo à chaque requête.
+    
+    Args:
+        filepath: Chemin du fichier
+        hasher: Fonction de calcul (generate_checksum par défaut)
+    """
+    key = _checksum_cache_key(filepath, hasher)
+
+    with _CHECKSUM_CACHE_LOCK:
+        checksum = _CHECKSUM_CACHE.get(key)
+        if checksum is not None:
+            # Marquer comme récemment utilisé (ordre d'insertion = LRU)
+            _CHECKSUM_CACHE[key] = _CHECKSUM_CACHE.pop(key)
+            return checksum
+
+    checksum = hasher(filepath)
+    _store_checksum(key, checksum)
+    return checksum
+
+
+def _checksum_cache_key(filepath, hasher):
+    st = os.stat(filepath)
+    return (str(filepath), st.st_mtime_ns, st.st_size, hasher.__name__)
+
+
+def _store_checksum(key, checksum):
+    with _CHECKSUM_CACHE_LOCK:
+        _CHECKSUM_CACHE[key] = checksum
+        while len(_CHECKSUM_CACHE) > _CHECKSUM_CACHE_MAX:
+            _CHECKSUM_CACHE.pop(next(iter(_CHECKSUM_CACHE)))
+
+
 # ==================== APK IPFS METADATA ====================
 
+_APK_META_CACHE = (None, {})  # ((mtime_ns, taille) du fichier, métadonnées)
+_APK_META_CACHE_LOCK = threading.Lock()
+
+
 def load_apk_ipfs_metadata():
     """
     Charge les métadonnées IPFS des APK depuis le fichier JSON.
     Retourne un dict avec les infos IPFS pour chaque APK.
+    
+    Le fichier n'est relu que si son mtime ou sa taille ont changé : le dict
+    renvoyé est partagé entre requêtes et ne doit pas être modifié.
     """
+    global _APK_META_CACHE
+    
+    stat_key = _stat_key(APK_IPFS_META_FILE)
+    with _APK_META_CACHE_LOCK:
+        cached_key, metadata = _APK_META_CACHE
+        if cached_key == stat_key:
+            return metadata
+    
+    metadata = {}
     try:
-        if APK_IPFS_META_FILE.exists():
+        if stat_key:
             with open(APK_IPFS_META_FILE, 'r') as f:
-                return json.load(f)
+                metadata = app.json.loads(f.read())
     except Exception as e:
         app_logger.error(f'Erreur lecture métadonnées IPFS: {format_error_for_log(e)}')
-    return {}
+        return metadata
+    
+    with _APK_META_CACHE_LOCK:
+        _APK_META_CACHE = (stat_key, metadata)
+    return metadata
 
 
 def save_apk_ipfs_metadata(metadata):
@@ -202,19 +572,28 @@ def save_apk_ipfs_metadata(metadata):
     Sauvegarde les métadonnées IPFS des APK.
     """
     try:
-        with open(APK_IPFS_META_FILE, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        if orjson is not None:
+            with open(APK_IPFS_META_FILE, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        else:
+            with open(APK_IPFS_META_FILE, 'w') as f:
+                json.dump(metadata, f, indent=2)
         app_logger.info(f'Métadonnées IPFS sauvegardées: {APK_IPFS_META_FILE}')
     except Exception as e:
         app_logger.error(f'Erreur sauvegarde métadonnées IPFS: {format_error_for_log(e)}')
 
 
-def get_apk_ipfs_url(apk_name):
+def get_apk_ipfs_url(apk_name, metadata=None):
     """
     Récupère l'URL IPFS pour un APK donné.
     Retourne None si non disponible.
+    
+    Args:
+        apk_name: Nom du fichier APK
+        metadata: Métadonnées IPFS déjà chargées (sinon lues depuis le disque)
     """
-    metadata = load_apk_ipfs_metadata()
+    if metadata is None:
+        metadata = load_apk_ipfs_metadata()
     apk_info = metadata.get('apks', {}).get(apk_name, {})
     cid = apk_info.get('cid')
     if cid:
@@ -228,71 +607,34 @@ def get_apk_ipfs_url(apk_name):
 
 # ==================== IPFS ASYNCHRONE ====================
 
-async def upload_to_ipfs_async(filepath) -> tuple:
+# Paramètres /api/v0/add : pas de flux de progression, une seule ligne JSON par fichier
+IPFS_ADD_PARAMS = {'progress': 'false', 'pin': 'true'}
+
+
+def parse_ipfs_add_hash(body: bytes) -> str:
     """
-    Upload un fichier vers IPFS de manière asynchrone avec aiohttp.
+    Extrait le CID d'une réponse /api/v0/add.
     
-    Args:
-        filepath: Chemin du fichier à uploader
-        
-    Returns:
-        Tuple (cid, ipfs_url) ou (None, None) si échec
+    La réponse est du NDJSON (une ligne par objet ajouté) : seule la dernière
+    ligne, celle du fichier envoyé, est décodée.
     """
-    if not IPFS_ENABLED:
-        return None, None
-    
-    try:
-        # Lire le fichier
-        with open(filepath, 'rb') as f:
-            file_content = f.read()
-        
-        # Préparer le multipart/form-data pour aiohttp
-        # L'API IPFS Kubo utilise multipart avec le fichier
-        data = aiohttp.FormData()
-        data.add_field(
-            'file',
-            file_content,
-            filename=os.path.basename(filepath),
-            content_type='application/octet-stream'
-        )
-        
-        timeout = aiohttp.ClientTimeout(total=IPFS_TIMEOUT)
-        
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(
-                f'{IPFS_API_URL}/api/v0/add',
-                data=data
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    cid = result['Hash']
-                    ipfs_url = f'{IPFS_GATEWAY}/ipfs/{cid}'
-                    
-                    app_logger.info(f'Fichier uploadé sur IPFS (async): {IPFS_GATEWAY}/ipfs/{cid}')
-                    return cid, ipfs_url
-                else:
-                    error_text = await response.text()
-                    app_logger.error(f'Erreur IPFS API: {response.status} - {error_text}')
-                    return None, None
-                    
-    except asyncio.TimeoutError:
-        app_logger.error(f'Timeout IPFS après {IPFS_TIMEOUT}s')
-        return None, None
-    except aiohttp.ClientError as e:
-        app_logger.error(f'Erreur connexion IPFS: {format_error_for_log(e)}')
-        return None, None
-    except Exception as e:
-        app_logger.error(f'Erreur upload IPFS: {format_error_for_log(e)}')
-        return None, None
+    return app.json.loads(body.rstrip().rsplit(b'\n', 1)[-1])['Hash']
+
 
+@atexit.register
+def _close_ipfs_session():
+    """Fermeture propre de la session HTTP IPFS à l'arrêt du worker"""
+    IPFS_SESSION.close()
 
-def upload_to_ipfs_sync(filepath) -> tuple:
+
+def upload_to_ipfs_sync(filepath, payload=None) -> tuple:
     """
     Upload synchrone vers IPFS (pour compatibilité et fallback).
     Utilisé dans le thread pool pour ne pas bloquer l'API.
     
     Args:
         filepath: Chemin du fichier à uploader
+        payload: Contenu du fichier déjà en mémoire (évite de relire filepath)
         
     Returns:
         Tuple (cid, ipfs_url) ou (None, None) si échec
@@ -301,18 +643,23 @@ def upload_to_ipfs_sync(filepath) -> tuple:
         return None, None
     
     try:
-        with open(filepath, 'rb') as f:
-            files = {'file': f}
+        with (BytesIO(payload) if payload is not None else open(filepath, 'rb')) as f:
+            # MultipartEncoder lit le fichier par blocs pendant l'envoi,
+            # au lieu de construire tout le corps multipart en mémoire
+            encoder = MultipartEncoder(fields={
+                'file': (os.path.basename(filepath), f, 'application/octet-stream')
+            })
             
-            response = requests.post(
+            response = IPFS_SESSION.post(
                 f'{IPFS_API_URL}/api/v0/add',
-                files=files,
+                data=encoder,
+                params=IPFS_ADD_PARAMS,
+                headers={'Content-Type': encoder.content_type},
                 timeout=IPFS_TIMEOUT
             )
             
             if response.status_code == 200:
-                result = response.json()
-                cid = result['Hash']
+                cid = parse_ipfs_add_hash(response.content)
                 ipfs_url = f'{IPFS_GATEWAY}/ipfs/{cid}'
                 
                 app_logger.info(f'Fichier uploadé sur IPFS (sync): {IPFS_GATEWAY}/ipfs/{cid}')
@@ -329,80 +676,291 @@ def upload_to_ipfs_sync(filepath) -> tuple:
         return None, None
 
 
-def upload_to_ipfs_background(filepath, callback=None):
+def upload_many_to_ipfs(files) -> list:
+    """
+    Ajoute plusieurs fichiers sur IPFS en une seule requête /api/v0/add
+    (une partie multipart "file" par fichier).
+    
+    Args:
+        files: Liste de (filepath, payload) ; payload peut être None
+        
+    Returns:
+        Liste de (cid, ipfs_url) alignée sur files, (None, None) si échec
+    """
+    failed = [(None, None)] * len(files)
+    if not IPFS_ENABLED:
+        return failed
+    
+    try:
+        with ExitStack() as stack:
+            fields = []
+            for filepath, payload in files:
+                source = BytesIO(payload) if payload is not None else stack.enter_context(open(filepath, 'rb'))
+                fields.append(('file', (os.path.basename(filepath), source, 'application/octet-stream')))
+            encoder = MultipartEncoder(fields=fields)
+            
+            response = IPFS_SESSION.post(
+                f'{IPFS_API_URL}/api/v0/add',
+                data=encoder,
+                params=IPFS_ADD_PARAMS,
+                headers={'Content-Type': encoder.content_type},
+                timeout=IPFS_TIMEOUT
+            )
+        
+        if response.status_code != 200:
+            app_logger.error(f'Erreur IPFS API (lot de {len(files)}): {response.status_code}')
+            return failed
+        
+        # Une ligne NDJSON par fichier, dans l'ordre d'envoi
+        entries = [app.json.loads(line) for line in response.content.splitlines() if line.strip()]
+        if len(entries) != len(files):
+            app_logger.error(f'Réponse IPFS inattendue: {len(entries)} entrées pour {len(files)} fichiers')
+            return failed
+        
+        results = []
+        for entry in entries:
+            cid = entry['Hash']
+            results.append((cid, f'{IPFS_GATEWAY}/ipfs/{cid}'))
+        app_logger.info(f'{len(files)} fichiers uploadés sur IPFS en une requête')
+        return results
+    
+    except requests.exceptions.RequestException as e:
+        app_logger.error(f'Erreur connexion IPFS: {format_error_for_log(e)}')
+        return failed
+    except Exception as e:
+        app_logger.error(f'Erreur upload IPFS: {format_error_for_log(e)}')
+        return failed
+
+
+# File des uploads en attente de regroupement : (filepath, payload, callback, future)
+_IPFS_UPLOAD_QUEUE = queue.Queue()
+_IPFS_BATCHER = None
+_IPFS_BATCHER_LOCK = threading.Lock()
+
+# Uploads IPFS en cours (en file ou en envoi), bornés par IPFS_QUEUE_SIZE
+_IPFS_PENDING = 0
+_IPFS_PENDING_LOCK = threading.Lock()
+
+
+def ipfs_queue_full():
+    """True si IPFS_QUEUE_SIZE uploads IPFS sont déjà en attente"""
+    with _IPFS_PENDING_LOCK:
+        return IPFS_ENABLED and _IPFS_PENDING >= IPFS_QUEUE_SIZE
+
+
+def _reserve_ipfs_slot():
+    global _IPFS_PENDING
+    with _IPFS_PENDING_LOCK:
+        if _IPFS_PENDING >= IPFS_QUEUE_SIZE:
+            return False
+        _IPFS_PENDING += 1
+        return True
+
+
+def _release_ipfs_slot():
+    global _IPFS_PENDING
+    with _IPFS_PENDING_LOCK:
+        _IPFS_PENDING -= 1
+
+
+def _ipfs_batcher_loop():
+    """
+    Consommateur de _IPFS_UPLOAD_QUEUE : accumule les uploads pendant au plus
+    IPFS_BATCH_FLUSH_MS (ou jusqu'à IPFS_BATCH_MAX fichiers), puis confie le
+    lot au thread pool IPFS.
+    """
+    while True:
+        jobs = [_IPFS_UPLOAD_QUEUE.get()]
+        deadline = time.monotonic() + IPFS_BATCH_FLUSH_MS / 1000
+        while len(jobs) < IPFS_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(_IPFS_UPLOAD_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        app_logger.debug(f'Lot IPFS: {len(jobs)} fichier(s), {_IPFS_PENDING} upload(s) en cours')
+        IPFS_EXECUTOR.submit(_run_ipfs_batch, jobs)
+
+
+def _run_ipfs_batch(jobs):
+    """
+    Upload d'un lot, puis métadonnées, callbacks et futures de chaque fichier.
+    Si la requête groupée échoue, chaque fichier est réessayé seul : un
+    fichier refusé ne fait pas échouer les autres. Un échec persistant est
+    noté 'failed' dans ses métadonnées (sinon le statut resterait 'pending').
+    """
+    if len(jobs) == 1:
+        filepath, payload, _, _ = jobs[0]
+        results = [upload_to_ipfs_sync(filepath, payload=payload)]
+    else:
+        results = upload_many_to_ipfs([(filepath, payload) for filepath, payload, _, _ in jobs])
+        if not any(cid for cid, _ in results):
+            app_logger.warning(f'Lot IPFS de {len(jobs)} fichiers en échec, nouvel essai fichier par fichier')
+            results = [upload_to_ipfs_sync(filepath, payload=payload) for filepath, payload, _, _ in jobs]
+    
+    for (filepath, _, callback, future), result in zip(jobs, results):
+        cid, ipfs_url = result
+        try:
+            # Sauvegarder les métadonnées : CID si upload réussi, sinon échec
+            if cid and ipfs_url:
+                save_ipfs_metadata(Path(filepath), cid, ipfs_url)
+            else:
+                save_ipfs_metadata(Path(filepath), failed=True)
+            
+            if callback:
+                callback(cid, ipfs_url)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            _release_ipfs_slot()
+
+
+def upload_to_ipfs_background(filepath, callback=None, payload=None):
     """
-    Lance l'upload IPFS en arrière-plan dans le thread pool.
+    Lance l'upload IPFS en arrière-plan.
     Ne bloque pas la requête HTTP.
     
+    Les fichiers arrivant en rafale sont regroupés en une seule requête
+    /api/v0/add (voir _ipfs_batcher_loop).
+    
     Args:
         filepath: Chemin du fichier à uploader
         callback: Fonction optionnelle appelée avec (cid, ipfs_url) à la fin
+        payload: Contenu du fichier déjà en mémoire (optionnel)
         
     Returns:
-        concurrent.futures.Future: Future représentant l'opération
+        concurrent.futures.Future: Future résolue avec (cid, ipfs_url) ;
+        (None, None) immédiatement si la file IPFS est pleine
     """
-    def _upload_and_callback():
-        result = upload_to_ipfs_sync(filepath)
-        cid, ipfs_url = result
-        
-        # Sauvegarder les métadonnées si upload réussi
-        if cid and ipfs_url:
-            save_ipfs_metadata(Path(filepath), cid, ipfs_url)
-        
+    global _IPFS_BATCHER
+    future = concurrent.futures.Future()
+    if not _reserve_ipfs_slot():
+        app_logger.warning(f'File IPFS pleine ({IPFS_QUEUE_SIZE}), upload ignoré: {filepath}')
+        save_ipfs_metadata(Path(filepath), failed=True)
         if callback:
-            callback(cid, ipfs_url)
-        return result
+            callback(None, None)
+        future.set_result((None, None))
+        return future
+    
+    with _IPFS_BATCHER_LOCK:
+        # Démarré au premier upload, donc dans le worker gunicorn (après le fork)
+        if _IPFS_BATCHER is None:
+            _IPFS_BATCHER = threading.Thread(target=_ipfs_batcher_loop, name='ipfs_batcher', daemon=True)
+            _IPFS_BATCHER.start()
     
-    return IPFS_EXECUTOR.submit(_upload_and_callback)
+    _IPFS_UPLOAD_QUEUE.put((filepath, payload, callback, future))
+    return future
 
 
 # Garder l'ancienne fonction pour compatibilité
 def upload_to_ipfs(filepath):
     """
     Upload un fichier vers IPFS via l'API locale (version synchrone).
-    DEPRECATED: Utiliser upload_to_ipfs_async ou upload_to_ipfs_background
+    DEPRECATED: Utiliser upload_to_ipfs_background
     
     Retourne: (cid, ipfs_url) ou (None, None) si échec
     """
     return upload_to_ipfs_sync(filepath)
 
 
+# ==================== PAGES HTML ====================
+
+# Cache des pages rendues : clé -> (expiration, html, etag, html gzip ou None)
+_PAGE_CACHE = {}
+_PAGE_CACHE_MAX = 128
+_PAGE_CACHE_LOCK = threading.Lock()
+
+
+def render_page_cached(cache_key, template_name, context_fn=None):
+    """
+    Rendu d'un template mis en cache PAGE_CACHE_TTL secondes, avec ETag.
+    
+    Sur un cache valide, ni le contexte (context_fn) ni Jinja ne sont
+    recalculés ; un client qui renvoie le même ETag (If-None-Match) reçoit
+    un 304 sans corps. La version gzip est compressée une fois au rendu et
+    servie aux clients qui l'acceptent (ETag distinct, Vary: Accept-Encoding).
+    
+    Args:
+        cache_key: Clé de cache (ex: 'invite:<npub>')
+        template_name: Template Jinja à rendre
+        context_fn: Fonction optionnelle retournant le contexte du template
+    """
+    now = time.monotonic()
+    with _PAGE_CACHE_LOCK:
+        entry = _PAGE_CACHE.get(cache_key)
+    
+    if entry is None or entry[0] <= now:
+        context = context_fn() if context_fn else {}
+        html = render_template(template_name, **context).encode('utf-8')
+        etag = hashlib.sha1(html).hexdigest()[:16]
+        html_gz = gzip.compress(html, compresslevel=6) if len(html) > 1024 else None
+        entry = (now + PAGE_CACHE_TTL, html, etag, html_gz)
+        with _PAGE_CACHE_LOCK:
+            _PAGE_CACHE.pop(cache_key, None)
+            _PAGE_CACHE[cache_key] = entry
+            while len(_PAGE_CACHE) > _PAGE_CACHE_MAX:
+                _PAGE_CACHE.pop(next(iter(_PAGE_CACHE)))
+    
+    _, html, etag, html_gz = entry
+    if html_gz is not None and 'gzip' in request.accept_encodings:
+        response = app.response_class(html_gz, mimetype='text/html')
+        response.content_encoding = 'gzip'
+        response.set_etag(f'{etag}-gz')
+    else:
+        response = app.response_class(html, mimetype='text/html')
+        response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = PAGE_CACHE_TTL
+    return response.make_conditional(request)
+
+
 @app.route('/')
 def index():
     """Page d'accueil"""
-    return render_template('zen.html')
+    return render_page_cached('index', 'zen.html')
 
 
 @app.route('/boucles')
 def boucles():
     """Schéma des boucles"""
-    return render_template('zen_boucles_schema.html')
+    return render_page_cached('boucles', 'zen_boucles_schema.html')
 
 @app.route('/monitor')
 def monitor():
     """Monitor Nostr"""
-    return render_template('monitor.html')
+    return render_page_cached('monitor', 'monitor.html')
 
 
 @app.route('/invite/<npub>')
 def invite_page(npub):
     """Page d'invitation virale"""
-    # Récupérer les infos de l'APK pour le lien de téléchargement
-    apk_result = get_latest_apk()
-    apk_info = apk_result.get_json() if not isinstance(apk_result, tuple) else apk_result[0].get_json()
+    def _context():
+        # Récupérer les infos de l'APK pour le lien de téléchargement
+        apk_info = get_latest_apk_info() or {}
+        return {
+            'referrer_npub': npub,
+            'apk_url': apk_info.get('download_url', '/')
+        }
     
-    return render_template('invite.html',
-                         referrer_npub=npub,
-                         apk_url=apk_info.get('download_url', '/'))
+    return render_page_cached(f'invite:{npub}', 'invite.html', _context)
 
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check"""
+    """Health check (ipfs_queue : uploads IPFS en attente dans ce worker)"""
     return jsonify({
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'ipfs_queue': {
+            'pending': _IPFS_PENDING,
+            'max': IPFS_QUEUE_SIZE,
+            'workers': IPFS_MAX_WORKERS
+        }
     })
 
 
@@ -428,8 +986,8 @@ def get_config():
                 'status': 'ok'
             },
             'nostr': {
-                'relay_url': os.getenv('NOSTR_RELAY', 'ws://127.0.0.1:7777'),
-                'enabled': os.getenv('NOSTR_ENABLED', 'true').lower() == 'true'
+                'relay_url': NOSTR_RELAY,
+                'enabled': NOSTR_ENABLED
             },
             'ipfs': {
                 'gateway': IPFS_GATEWAY,
@@ -448,6 +1006,41 @@ def get_config():
     })
 
 
+@lru_cache(maxsize=16)
+def render_qr_png(data, error='L', border=4):
+    """
+    PNG d'un QR code (niveau de correction d'erreur 'L', 'M', 'Q' ou 'H').
+    
+    L'image ne dépend que de ses paramètres : le résultat est mémorisé, ce qui
+    évite de refaire l'encodage (Reed-Solomon, placement des modules) et la
+    compression PNG à chaque requête identique.
+    
+    Avec segno installé, le PNG est écrit directement par son encodeur, sans
+    passer par un dessin PIL pixel par pixel (make_qr : jamais de Micro QR,
+    illisible par la plupart des applis photo).
+    """
+    img_io = BytesIO()
+    if segno is not None:
+        qr = segno.make_qr(data, error=error, boost_error=False)
+        qr.save(img_io, kind='png', scale=10, border=border)
+        return img_io.getvalue()
+    
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{error}'),
+        box_size=10,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    
+    # Convertir en bytes
+    img.save(img_io, 'PNG')
+    return img_io.getvalue()
+
+
 @app.route('/api/box/qr', methods=['GET'])
 def get_box_qr_codes():
     """
@@ -474,23 +1067,10 @@ def get_box_qr_codes():
     # Format: troczen://market?seed=<seed>&name=<market_name>
     market_qr_data = f"troczen://market?seed={MARKET_SEED}&name={MARKET_NAME}"
     
-    # Créer les QR codes
+    # Créer les QR codes (mis en cache : données fixes tant que .env ne change pas)
     def generate_qr_base64(data):
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=2,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir en base64
-        img_io = BytesIO()
-        img.save(img_io, 'PNG')
-        img_io.seek(0)
-        return base64.b64encode(img_io.read()).decode('utf-8')
+        png = render_qr_png(data, 'M', border=2)
+        return base64.b64encode(png).decode('utf-8')
     
     return jsonify({
         'success': True,
@@ -510,6 +1090,48 @@ def get_box_qr_codes():
     })
 
 
+# Résultat des sondes mis en cache : les clients Flutter interrogent souvent
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', '5'))
+HEALTH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='health')
+_HEALTH_CACHE = (0, None)  # (expiration monotonic, réponse)
+_HEALTH_LOCK = threading.Lock()
+
+
+def probe_nostr():
+    """Connexion TCP au relai Nostr : 'ok', 'unreachable', 'disabled' ou 'error: ...'"""
+    if not NOSTR_ENABLED:
+        return 'disabled'
+    try:
+        import socket
+        from urllib.parse import urlparse
+        parsed = urlparse(NOSTR_RELAY)
+        host = parsed.hostname or '127.0.0.1'
+        port = parsed.port or 7777
+        
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(3)
+        result = sock.connect_ex((host, port))
+        sock.close()
+        
+        return 'ok' if result == 0 else 'unreachable'
+    except Exception as e:
+        return f'error: {str(e)[:50]}'
+
+
+def probe_ipfs():
+    """Appel /api/v0/id du nœud IPFS : 'ok', 'error', 'disabled' ou 'error: ...'"""
+    if not IPFS_ENABLED:
+        return 'disabled'
+    try:
+        response = IPFS_SESSION.post(
+            f'{IPFS_API_URL}/api/v0/id',
+            timeout=5
+        )
+        return 'ok' if response.status_code == 200 else 'error'
+    except Exception as e:
+        return f'error: {str(e)[:50]}'
+
+
 @app.route('/api/health/services', methods=['GET'])
 def services_health():
     """
@@ -519,58 +1141,36 @@ def services_health():
     - Tester la connectivité Nostr
     - Tester la connectivité IPFS
     - Afficher le statut des services
-    """
-    results = {
-        'api': 'ok',
-        'nostr': 'unknown',
-        'ipfs': 'unknown'
-    }
     
-    # Test Nostr
-    NOSTR_RELAY = os.getenv('NOSTR_RELAY', 'ws://127.0.0.1:7777')
-    NOSTR_ENABLED = os.getenv('NOSTR_ENABLED', 'true').lower() == 'true'
-    
-    if NOSTR_ENABLED:
-        try:
-            import socket
-            from urllib.parse import urlparse
-            parsed = urlparse(NOSTR_RELAY)
-            host = parsed.hostname or '127.0.0.1'
-            port = parsed.port or 7777
+    Les deux sondes tournent en parallèle et leur résultat est réutilisé
+    pendant HEALTH_CACHE_TTL secondes (timestamp = heure de la sonde).
+    """
+    global _HEALTH_CACHE
+    
+    # Un seul thread sonde à la fois ; les autres reprennent son résultat
+    with _HEALTH_LOCK:
+        expires, body = _HEALTH_CACHE
+        if body is None or expires <= time.monotonic():
+            nostr_future = HEALTH_EXECUTOR.submit(probe_nostr)
+            ipfs_future = HEALTH_EXECUTOR.submit(probe_ipfs)
+            results = {
+                'api': 'ok',
+                'nostr': nostr_future.result(),
+                'ipfs': ipfs_future.result()
+            }
             
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3)
-            result = sock.connect_ex((host, port))
-            sock.close()
+            # Statut global
+            all_ok = all(v in ['ok', 'disabled', 'unknown'] for v in results.values())
             
-            results['nostr'] = 'ok' if result == 0 else 'unreachable'
-        except Exception as e:
-            results['nostr'] = f'error: {str(e)[:50]}'
-    else:
-        results['nostr'] = 'disabled'
-    
-    # Test IPFS
-    if IPFS_ENABLED:
-        try:
-            response = requests.post(
-                f'{IPFS_API_URL}/api/v0/id',
-                timeout=5
-            )
-            results['ipfs'] = 'ok' if response.status_code == 200 else 'error'
-        except Exception as e:
-            results['ipfs'] = f'error: {str(e)[:50]}'
-    else:
-        results['ipfs'] = 'disabled'
-    
-    # Statut global
-    all_ok = all(v in ['ok', 'disabled', 'unknown'] for v in results.values())
+            body = {
+                'success': True,
+                'status': 'healthy' if all_ok else 'degraded',
+                'services': results,
+                'timestamp': datetime.now().isoformat()
+            }
+            _HEALTH_CACHE = (time.monotonic() + HEALTH_CACHE_TTL, body)
     
-    return jsonify({
-        'success': True,
-        'status': 'healthy' if all_ok else 'degraded',
-        'services': results,
-        'timestamp': datetime.now().isoformat()
-    })
+    return jsonify(body)
 
 
 # ==================== UPLOAD IMAGES ====================
@@ -585,6 +1185,9 @@ def upload_image():
     - Validation des magic bytes pour éviter les fichiers malveillants
     - Upload IPFS en arrière-plan pour ne pas bloquer la requête
     """
+    # File IPFS pleine : refuser avant que request.files ne lise tout le corps
+    if ipfs_queue_full():
+        return ipfs_queue_full_response()
     
     # Vérifier présence fichier
     if 'file' not in request.files:
@@ -613,61 +1216,381 @@ def upload_image():
             error_code=400
         )), 400
     
-    # Récupérer npub du commerçant/utilisateur
+    # Récupérer npub du commerçant/utilisateur et type d'image (logo, banner, avatar)
     npub = request.form.get('npub')
-    if not npub:
-        return jsonify(create_api_error_response(
-            error_message="Missing npub",
-            error_code=400
-        )), 400
-    
-    # Récupérer le type d'image (logo, banner, avatar)
     image_type = request.form.get('type', 'logo')
-    if image_type not in ['logo', 'banner', 'avatar']:
+    error_msg = validate_upload_params(npub, image_type)
+    if error_msg:
         return jsonify(create_api_error_response(
-            error_message="Invalid image type (must be logo, banner, or avatar)",
+            error_message=error_msg,
             error_code=400
         )), 400
     
-    # Nom sécurisé
-    filename = secure_filename(file.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
-    
-    # Nouveau nom: npub_type_timestamp.ext
-    new_filename = f"{npub[:16]}_{image_type}_{int(datetime.now().timestamp())}.{ext}"
+    new_filename = build_upload_filename(npub, image_type, file.filename)
     filepath = UPLOAD_FOLDER / new_filename
     
-    # Sauvegarder localement
-    file.save(filepath)
-    
-    # Générer checksum
-    checksum = generate_checksum(filepath)
-    
-    # URL de fallback (locale) - toujours disponible
-    local_url = f"/uploads/{new_filename}"
+    # Sauvegarder localement (SHA256 calculé pendant l'écriture)
+    try:
+        checksum, payload = save_upload_stream(file.stream, filepath)
+    except ValueError:
+        return jsonify(create_api_error_response(
+            error_message=f"File too large (max {MAX_FILE_SIZE} bytes)",
+            error_code=413
+        )), 413
+    except Exception as e:
+        app_logger.error(f'Erreur écriture upload: {format_error_for_log(e)}')
+        return jsonify(create_api_error_response(
+            error_message="Erreur interne du serveur",
+            error_code=500
+        )), 500
     
-    # ✅ Upload IPFS en arrière-plan (non-bloquant)
-    # Le client recevra l'URL locale immédiatement, et l'URL IPFS sera disponible plus tard
-    ipfs_upload_future = upload_to_ipfs_background(filepath)
+    # ✅ Contenu déjà connu : CID réutilisé, sinon upload IPFS en arrière-plan
+    # Le client suit l'upload IPFS via /api/upload/status/<filename>
+    cid, ipfs_url, _ = finalize_upload(filepath, checksum, payload)
     
-    # Pour la réponse initiale, on indique que l'upload IPFS est en cours
-    # Le client peut vérifier le statut via /api/upload/status/<filename>
+    return jsonify(build_upload_response(filepath, image_type, checksum, cid, ipfs_url)), 201
+
+
+@app.route('/api/upload/image', methods=['PUT'])
+def upload_image_raw():
+    """
+    Upload image brut : le corps de la requête EST le fichier (pas de multipart).
+    
+    Le flux est copié par blocs de 1 Mo directement sur disque, sans passer par
+    le parseur multipart de werkzeug, et le SHA256 est calculé pendant l'écriture.
+    
+    Paramètres (query string ou en-têtes X-Npub / X-Image-Type / X-Filename):
+    - npub: clé publique du commerçant/utilisateur
+    - type: logo|banner|avatar (défaut: logo)
+    - filename: nom d'origine, pour l'extension
+    """
+    npub = request.args.get('npub') or request.headers.get('X-Npub')
+    image_type = request.args.get('type') or request.headers.get('X-Image-Type', 'logo')
+    original_name = request.args.get('filename') or request.headers.get('X-Filename', '')
+    
+    error_msg = validate_upload_params(npub, image_type)
+    if error_msg:
+        return jsonify(create_api_error_response(
+            error_message=error_msg,
+            error_code=400
+        )), 400
+    
+    if ipfs_queue_full():
+        return ipfs_queue_full_response()
+    
+    # Lire le premier bloc pour la validation extension + magic bytes
+    stream = request.stream
+    first_chunk = stream.read(UPLOAD_CHUNK_SIZE)
+    is_valid, error_msg = allowed_file(original_name, first_chunk[:12])
+    if not is_valid:
+        return jsonify(create_api_error_response(
+            error_message=error_msg,
+            error_code=400
+        )), 400
+    
+    new_filename = build_upload_filename(npub, image_type, original_name)
+    filepath = UPLOAD_FOLDER / new_filename
+    
+    try:
+        checksum, payload = save_upload_stream(stream, filepath, first_chunk)
+    except ValueError:
+        return jsonify(create_api_error_response(
+            error_message=f"File too large (max {MAX_FILE_SIZE} bytes)",
+            error_code=413
+        )), 413
+    except Exception as e:
+        app_logger.error(f'Erreur écriture upload: {format_error_for_log(e)}')
+        return jsonify(create_api_error_response(
+            error_message="Erreur interne du serveur",
+            error_code=500
+        )), 500
+    
+    # ✅ Contenu déjà connu : CID réutilisé, sinon upload IPFS en arrière-plan
+    cid, ipfs_url, _ = finalize_upload(filepath, checksum, payload)
+    
+    return jsonify(build_upload_response(filepath, image_type, checksum, cid, ipfs_url)), 201
+
+
+@app.route('/api/upload/images', methods=['POST'])
+def upload_images_batch():
+    """
+    Upload de plusieurs images (logo, bannière, avatar) en une seule requête.
+    
+    Champs multipart:
+    - files: les fichiers (répétés)
+    - types: type de chaque fichier, aligné par index (défaut: logo)
+    - npub: clé publique du commerçant/utilisateur
+    
+    Les uploads IPFS sont lancés en parallèle dans le thread pool ; la réponse
+    attend leurs CID au plus UPLOAD_BATCH_WAIT secondes (sinon ipfs_status reste
+    'pending' et le client peut suivre via /api/upload/status/<filename>).
+    """
+    # File IPFS pleine : refuser avant que request.files ne lise tout le corps
+    if ipfs_queue_full():
+        return ipfs_queue_full_response()
+    
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify(create_api_error_response(
+            error_message="No file provided",
+            error_code=400
+        )), 400
+    
+    npub = request.form.get('npub')
+    types = request.form.getlist('types')
+    
+    results = []
+    futures = {}
+    for index, file in enumerate(files):
+        image_type = types[index] if index < len(types) else 'logo'
+        
+        error_msg = validate_upload_params(npub, image_type)
+        if not error_msg:
+            is_valid, error_msg = allowed_file(file.filename, file.read(12))
+            file.seek(0)
+        if error_msg:
+            results.append({
+                'success': False,
+                'original_filename': file.filename,
+                'type': image_type,
+                'error': error_msg
+            })
+            continue
+        
+        # Suffixe d'index : plusieurs fichiers du même type dans la même seconde
+        new_filename = build_upload_filename(npub, image_type, file.filename)
+        if index:
+            stem, ext = new_filename.rsplit('.', 1)
+            new_filename = f"{stem}_{index}.{ext}"
+        filepath = UPLOAD_FOLDER / new_filename
+        try:
+            checksum, payload = save_upload_stream(file.stream, filepath)
+        except ValueError:
+            results.append({
+                'success': False,
+                'original_filename': file.filename,
+                'type': image_type,
+                'error': f"File too large (max {MAX_FILE_SIZE} bytes)"
+            })
+            continue
+        
+        cid, ipfs_url, future = finalize_upload(filepath, checksum, payload)
+        result = build_upload_response(filepath, image_type, checksum, cid, ipfs_url)
+        result['original_filename'] = file.filename
+        results.append(result)
+        if future is not None:
+            futures[future] = result
+    
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=UPLOAD_BATCH_WAIT):
+            cid, ipfs_url = future.result()
+            result = futures[future]
+            if cid:
+                result.update({
+                    'url': ipfs_url,
+                    'ipfs_url': ipfs_url,
+                    'ipfs_cid': cid,
+                    'ipfs_status': 'completed',
+                    'storage': 'ipfs',
+                    'message': 'Fichier uploadé sur IPFS.'
+                })
+            else:
+                result.update({
+                    'ipfs_status': 'failed',
+                    'message': 'Fichier uploadé localement. Upload IPFS échoué.'
+                })
+    except concurrent.futures.TimeoutError:
+        app_logger.warning(f'Upload IPFS groupé: délai de {UPLOAD_BATCH_WAIT}s dépassé, statuts partiels')
     
+    success = any(result['success'] for result in results)
     return jsonify({
+        'success': success,
+        'results': results
+    }), 201 if success else 400
+
+
+def validate_upload_params(npub, image_type):
+    """
+    Valide les paramètres d'un upload d'image.
+    
+    Returns:
+        Message d'erreur, ou None si les paramètres sont valides
+    """
+    if not npub:
+        return "Missing npub"
+    if image_type not in ['logo', 'banner', 'avatar']:
+        return "Invalid image type (must be logo, banner, or avatar)"
+    return None
+
+
+def ipfs_queue_full_response():
+    """503 + Retry-After quand la file d'upload IPFS est saturée"""
+    response = jsonify(create_api_error_response(
+        error_message="IPFS upload queue is full, retry later",
+        error_code=503
+    ))
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+def build_upload_filename(npub, image_type, original_name):
+    """
+    Nouveau nom sécurisé: npub_type_timestamp.ext
+    
+    L'extension vient du nom d'origine, déjà validé par allowed_file :
+    secure_filename('日本.png') renvoie 'png', sans point.
+    """
+    ext = original_name.rpartition('.')[2].lower()
+    return f"{npub[:16]}_{image_type}_{int(datetime.now().timestamp())}.{ext}"
+
+
+def build_upload_response(filepath, image_type, checksum, cid=None, ipfs_url=None):
+    """
+    Réponse JSON d'un upload d'image.
+    IPFS est en cours à ce stade, sauf si le contenu était déjà connu (cid fourni).
+    """
+    # URL de fallback (locale) - toujours disponible
+    local_url = f"/uploads/{filepath.name}"
+    
+    if cid:
+        return {
+            'success': True,
+            'url': ipfs_url,
+            'local_url': local_url,
+            'ipfs_url': ipfs_url,
+            'ipfs_cid': cid,
+            'ipfs_status': 'completed',
+            'filename': filepath.name,
+            'checksum': checksum,
+            'checksum_status': 'completed',
+            'size': filepath.stat().st_size,
+            'uploaded_at': datetime.now().isoformat(),
+            'storage': 'ipfs',
+            'type': image_type,
+            'deduplicated': True,
+            'message': 'Contenu déjà présent sur IPFS.'
+        }
+    
+    return {
         'success': True,
         'url': local_url,              # URL locale immédiatement disponible
         'local_url': local_url,        # Toujours disponible en fallback
         'ipfs_url': None,              # Sera disponible après upload
         'ipfs_cid': None,              # Sera disponible après upload
         'ipfs_status': 'pending',      # pending, completed, failed
-        'filename': new_filename,
+        'filename': filepath.name,
         'checksum': checksum,
+        'checksum_status': 'completed',
         'size': filepath.stat().st_size,
         'uploaded_at': datetime.now().isoformat(),
         'storage': 'local',            # Local pour l'instant, IPFS en cours
         'type': image_type,
         'message': 'Fichier uploadé localement. Upload IPFS en cours.'
-    }), 201
+    }
+
+
+def save_upload_stream(stream, filepath, first_chunk=b''):
+    """
+    Copie un flux d'upload sur disque par blocs de 1 Mo, en calculant le
+    SHA256 au fil de l'eau (une seule passe). Écriture dans un fichier .part
+    renommé à la fin : un fichier visible est toujours complet.
+    
+    Les petits fichiers (au plus UPLOAD_MEMORY_MAX) sont aussi conservés en
+    mémoire pour l'upload IPFS, qui n'a ainsi pas à les relire ; au-delà, rien
+    n'est accumulé, pour ne pas garder jusqu'à MAX_FILE_SIZE par upload en
+    file d'attente.
+    
+    Args:
+        stream: Flux source (request.stream, FileStorage.stream...) ; un
+                UploadSpoolFile est simplement renommé
+        filepath: Chemin de destination
+        first_chunk: Octets déjà lus sur le flux (validation magic bytes)
+        
+    Returns:
+        Tuple (checksum SHA256 hexadécimal, contenu du fichier ou None)
+        
+    Raises:
+        ValueError: si le fichier dépasse MAX_FILE_SIZE
+    """
+    if isinstance(stream, UploadSpoolFile) and not first_chunk:
+        # Déjà sur disque et haché par le parseur multipart
+        return stream.commit(filepath)
+    
+    tmp_path = filepath.with_suffix(filepath.suffix + '.part')
+    sha256_hash = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as dst:
+            chunk = first_chunk or stream.read(UPLOAD_CHUNK_SIZE)
+            while chunk:
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise ValueError('File too large')
+                sha256_hash.update(chunk)
+                dst.write(chunk)
+                if size <= UPLOAD_MEMORY_MAX:
+                    buffer += chunk
+                else:
+                    buffer = None
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    checksum = sha256_hash.hexdigest()
+    return checksum, bytes(buffer) if buffer is not None else None
+
+
+def finalize_upload(filepath, checksum, payload=None):
+    """
+    Déduplication par contenu d'un fichier uploadé.
+    
+    Chaque contenu est stocké une seule fois sous UPLOAD_FOLDER/sha256-<hex>.<ext> ;
+    le nom "lisible" (npub_type_timestamp.ext) en est un lien physique. Le
+    fichier .ipfs_meta du contenu sert d'index checksum -> CID : si l'image
+    a déjà été envoyée sur IPFS, son CID est réutilisé sans nouvel ajout.
+    
+    Args:
+        filepath: Fichier uploadé (nom lisible)
+        checksum: SHA256 du contenu
+        payload: Contenu en mémoire, transmis à IPFS sans relecture du disque
+        
+    Returns:
+        Tuple (cid, ipfs_url, future) : CID connu (future None), ou
+        (None, None, future) de l'upload IPFS lancé en arrière-plan
+    """
+    content_path = UPLOAD_FOLDER / f"sha256-{checksum}{filepath.suffix}"
+    try:
+        try:
+            os.link(filepath, content_path)
+        except FileExistsError:
+            # Contenu déjà stocké : remplacer le nouveau fichier par un lien
+            tmp_link = filepath.with_suffix(filepath.suffix + '.link')
+            tmp_link.unlink(missing_ok=True)
+            os.link(content_path, tmp_link)
+            os.replace(tmp_link, filepath)
+    except OSError as e:
+        # Système de fichiers sans liens physiques : pas de déduplication
+        app_logger.warning(f'Déduplication impossible: {format_error_for_log(e)}')
+        save_ipfs_metadata(filepath, checksum=checksum)
+        return None, None, upload_to_ipfs_background(filepath, payload=payload)
+    
+    content_meta = load_ipfs_metadata(content_path)
+    cid = content_meta.get('ipfs_cid')
+    ipfs_url = content_meta.get('ipfs_url')
+    save_ipfs_metadata(filepath, cid, ipfs_url, checksum)
+    
+    if cid:
+        app_logger.info(f'Upload dédupliqué: {filepath.name} -> {cid}')
+        return cid, ipfs_url, None
+    
+    # ✅ Upload IPFS en arrière-plan (non-bloquant), CID indexé sur le contenu
+    def _index_cid(cid, ipfs_url):
+        save_ipfs_metadata(content_path, cid, ipfs_url, checksum)
+    
+    return None, None, upload_to_ipfs_background(filepath, _index_cid, payload)
 
 
 @app.route('/api/upload/status/<filename>', methods=['GET'])
@@ -686,20 +1609,14 @@ def upload_status(filename):
             error_code=404
         )), 404
     
-    # Vérifier si un fichier .ipfs_meta existe (créé après upload réussi)
+    # Le fichier .ipfs_meta reçoit le checksum puis le CID une fois l'upload IPFS réussi
     meta_file = filepath.with_suffix(filepath.suffix + '.ipfs_meta')
+    meta = {}
     
     if meta_file.exists():
         try:
             with open(meta_file, 'r') as f:
-                meta = json.load(f)
-            return jsonify({
-                'filename': filename,
-                'ipfs_status': 'completed',
-                'ipfs_url': meta.get('ipfs_url'),
-                'ipfs_cid': meta.get('ipfs_cid'),
-                'uploaded_at': meta.get('uploaded_at')
-            })
+                meta = app.json.loads(f.read())
         except Exception as e:
             return jsonify({
                 'filename': filename,
@@ -707,30 +1624,127 @@ def upload_status(filename):
                 'error': str(e)
             })
     
+    checksum = meta.get('checksum')
+    checksum_status = 'completed' if checksum else 'pending'
+    
+    if meta.get('ipfs_status') == 'failed':
+        return jsonify({
+            'filename': filename,
+            'ipfs_status': 'failed',
+            'checksum': checksum,
+            'checksum_status': checksum_status,
+            'message': 'Upload IPFS échoué, fichier disponible localement'
+        })
+    
+    if meta.get('ipfs_cid'):
+        return jsonify({
+            'filename': filename,
+            'ipfs_status': 'completed',
+            'ipfs_url': meta.get('ipfs_url'),
+            'ipfs_cid': meta.get('ipfs_cid'),
+            'uploaded_at': meta.get('uploaded_at'),
+            'checksum': checksum,
+            'checksum_status': checksum_status
+        })
+    
     return jsonify({
         'filename': filename,
         'ipfs_status': 'pending',
+        'checksum': checksum,
+        'checksum_status': checksum_status,
         'message': 'Upload IPFS en cours ou non démarré'
     })
 
 
-def save_ipfs_metadata(filepath, cid, ipfs_url):
+def load_ipfs_metadata(filepath):
+    """Lire les métadonnées d'un upload ({} si absentes ou illisibles)"""
+    meta_file = filepath.with_suffix(filepath.suffix + '.ipfs_meta')
+    try:
+        with open(meta_file, 'r') as f:
+            return app.json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_ipfs_metadata(filepath, cid=None, ipfs_url=None, checksum=None, failed=False):
     """
-    Sauvegarder les métadonnées IPFS après upload réussi.
+    Sauvegarder les métadonnées d'un upload (checksum, puis IPFS après upload réussi,
+    ou failed=True si l'upload IPFS a définitivement échoué).
+    Les champs fournis sont fusionnés avec ceux déjà présents.
     Permet au client de vérifier le statut via /api/upload/status/
     """
     meta_file = filepath.with_suffix(filepath.suffix + '.ipfs_meta')
     try:
-        with open(meta_file, 'w') as f:
-            json.dump({
-                'ipfs_cid': cid,
-                'ipfs_url': ipfs_url,
-                'uploaded_at': datetime.now().isoformat()
-            }, f)
+        meta = {}
+        if meta_file.exists():
+            with open(meta_file, 'r') as f:
+                meta = app.json.loads(f.read())
+        
+        if checksum:
+            meta['checksum'] = checksum
+        if cid:
+            meta['ipfs_cid'] = cid
+            meta['ipfs_url'] = ipfs_url
+            meta['uploaded_at'] = datetime.now().isoformat()
+            meta.pop('ipfs_status', None)
+        elif failed:
+            meta['ipfs_status'] = 'failed'
+        
+        # Écriture atomique : le endpoint de statut ne lit jamais un fichier partiel
+        tmp_file = meta_file.with_suffix(meta_file.suffix + '.tmp')
+        with open(tmp_file, 'w') as f:
+            f.write(app.json.dumps(meta))
+        os.replace(tmp_file, meta_file)
     except Exception as e:
         app_logger.error(f'Erreur sauvegarde métadonnées IPFS: {format_error_for_log(e)}')
 
 
+def send_local_file(filepath, internal_prefix, mimetype=None, as_attachment=False, download_name=None,
+                    etag=True, max_age=None):
+    """
+    Envoie un fichier local au client.
+    
+    Si USE_XACCEL est activé (API derrière nginx), seule une réponse vide avec
+    l'en-tête X-Accel-Redirect est renvoyée : nginx transmet le fichier lui-même
+    (sendfile) et le worker Python est libéré dès l'envoi des en-têtes.
+    Avec USE_XSENDFILE (Apache), send_file() renvoie de même un en-tête X-Sendfile.
+    
+    Args:
+        filepath: Chemin du fichier à envoyer
+        internal_prefix: Location nginx 'internal' qui sert le dossier du fichier
+        mimetype: Type MIME (sinon déduit par nginx / Flask)
+        as_attachment: Forcer le téléchargement (Content-Disposition)
+        download_name: Nom proposé au téléchargement
+        etag: ETag (True = dérivé de mtime/taille par Flask) ; If-None-Match
+              et Range sont gérés par send_file (par nginx avec X-Accel)
+        max_age: Durée de cache client (Cache-Control public), en secondes
+    """
+    if not USE_XACCEL:
+        return send_file(
+            filepath,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            etag=etag,
+            max_age=max_age
+        )
+    
+    response = app.response_class()
+    response.headers['X-Accel-Redirect'] = f"{internal_prefix}/{quote(filepath.name)}"
+    if mimetype:
+        response.headers['Content-Type'] = mimetype
+    else:
+        # Laisser nginx déterminer le type depuis l'extension
+        del response.headers['Content-Type']
+    if as_attachment:
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name or filepath.name}"'
+    if max_age:
+        # Transmis par nginx au client avec le fichier
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
 @app.route('/uploads/<filename>')
 def serve_upload(filename):
     """Servir fichier uploadé"""
@@ -740,7 +1754,8 @@ def serve_upload(filename):
             error_message="File not found",
             error_code=404
         )), 404
-    return send_file(filepath)
+    # Noms horodatés à l'upload : un même nom garde le même contenu
+    return send_local_file(filepath, XACCEL_UPLOADS_PREFIX, max_age=UPLOAD_CACHE_MAX_AGE)
 
 
 # ==================== APK DISTRIBUTION ====================
@@ -748,62 +1763,131 @@ def serve_upload(filename):
 @app.route('/api/apk/latest', methods=['GET'])
 def get_latest_apk():
     """Informations sur la dernière version APK (local ou IPFS)"""
+    apk_info = get_latest_apk_info()
+    if apk_info is None:
+        return jsonify(create_api_error_response(
+            error_message="No APK available",
+            error_code=404
+        )), 404
+    return jsonify(apk_info)
+
+
+def get_latest_apk_info():
+    """
+    Informations sur la dernière version APK, ou None si aucun APK.
     
-    apk_files = list(APK_FOLDER.glob('*.apk'))
-    
+    Le dernier APK n'est recherché qu'après un changement du dossier (ajout,
+    suppression, mise à jour du lien latest.apk) ; ses infos sont mises en
+    cache tant que ni ce fichier (réécrit sur place : même mtime de dossier)
+    ni ipfs_meta.json ne changent. En régime établi : trois stat, ni parcours
+    du dossier, ni checksum.
+    """
+    latest_apk = _find_latest_apk_cached(_mtime_ns(APK_FOLDER))
+    apk_info = _latest_apk_info_cached(
+        latest_apk,
+        _stat_key(latest_apk) if latest_apk is not None else None,
+        _stat_key(APK_IPFS_META_FILE)
+    )
+    return dict(apk_info) if apk_info is not None else None
+
+
+def _mtime_ns(path):
+    """mtime en nanosecondes, 0 si le chemin n'existe pas"""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _stat_key(path):
+    """(mtime_ns, taille) du fichier, 0 s'il n'existe pas"""
+    try:
+        st = path.stat()
+    except OSError:
+        return 0
+    return (st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=4)
+def _find_latest_apk_cached(folder_mtime_ns):
+    """find_latest_apk mis en cache par mtime du dossier APK"""
+    return find_latest_apk()
+
+
+@lru_cache(maxsize=4)
+def _latest_apk_info_cached(latest_apk, apk_stat_key, meta_stat_key):
+    """Calcul effectif de get_latest_apk_info (clé de cache = APK et (mtime, taille))"""
     # Charger les métadonnées IPFS
     ipfs_metadata = load_apk_ipfs_metadata()
     
     # Si pas de fichiers locaux, vérifier IPFS
-    if not apk_files:
+    if latest_apk is None:
         # Vérifier si on a des métadonnées IPFS
         if ipfs_metadata.get('apks'):
             # Prendre le plus récent
             apks_list = list(ipfs_metadata['apks'].items())
             if apks_list:
                 latest_name, latest_info = apks_list[-1]
-                ipfs_url = get_apk_ipfs_url(latest_name)
-                return jsonify({
+                return {
                     'filename': latest_name,
                     'version': latest_name.replace('troczen-', '').replace('.apk', ''),
                     'size': latest_info.get('size', 0),
                     'checksum': latest_info.get('checksum', ''),
                     'download_url': f'/api/apk/download/{latest_name}',
-                    'ipfs_url': ipfs_url,
+                    'ipfs_url': get_apk_ipfs_url(latest_name, ipfs_metadata),
                     'ipfs_cid': latest_info.get('cid'),
                     'storage': 'ipfs',
                     'updated_at': latest_info.get('uploaded_at', '')
-                })
-        
-        return jsonify(create_api_error_response(
-            error_message="No APK available",
-            error_code=404
-        )), 404
-    
-    # Trier par date de modification
-    latest_apk = max(apk_files, key=lambda p: p.stat().st_mtime)
+                }
+        return None
     
-    checksum = generate_checksum(latest_apk)
-    ipfs_url = get_apk_ipfs_url(latest_apk.name)
+    latest_stat = latest_apk.stat()
+    checksum = get_cached_checksum(latest_apk, load_apk_checksum)
+    ipfs_url = get_apk_ipfs_url(latest_apk.name, ipfs_metadata)
     
-    response = {
+    apk_info = {
         'filename': latest_apk.name,
         'version': latest_apk.stem.replace('troczen-', ''),
-        'size': latest_apk.stat().st_size,
+        'size': latest_stat.st_size,
         'checksum': checksum,
         'download_url': f'/api/apk/download/{latest_apk.name}',
-        'updated_at': datetime.fromtimestamp(latest_apk.stat().st_mtime).isoformat(),
+        'updated_at': datetime.fromtimestamp(latest_stat.st_mtime).isoformat(),
         'storage': 'local'
     }
     
     # Ajouter infos IPFS si disponibles
     if ipfs_url:
-        response['ipfs_url'] = ipfs_url
-        apk_info = ipfs_metadata.get('apks', {}).get(latest_apk.name, {})
-        response['ipfs_cid'] = apk_info.get('cid')
-        response['storage'] = 'local+ipfs'
+        apk_info['ipfs_url'] = ipfs_url
+        apk_info['ipfs_cid'] = ipfs_metadata.get('apks', {}).get(latest_apk.name, {}).get('cid')
+        apk_info['storage'] = 'local+ipfs'
+    
+    return apk_info
+
+
+def find_latest_apk():
+    """
+    Chemin de l'APK le plus récent, ou None si aucun APK local.
     
-    return jsonify(response)
+    Résout le lien APK_LATEST_LINK (un seul stat, quel que soit le nombre de
+    versions conservées) ; à défaut, parcourt le dossier et prend l'APK
+    modifié le plus récemment.
+    """
+    try:
+        target = APK_LATEST_LINK.resolve(strict=True)
+        if target.parent == APK_FOLDER and target.suffix == '.apk' and target.is_file():
+            return target
+    except (OSError, RuntimeError):
+        pass
+    
+    # Fallback : un seul parcours du dossier ; DirEntry.stat() est mis en cache par entrée
+    with os.scandir(APK_FOLDER) as entries:
+        apk_files = [
+            e for e in entries
+            if e.name.endswith('.apk') and e.name != APK_LATEST_LINK.name and e.is_file()
+        ]
+    if not apk_files:
+        return None
+    return Path(max(apk_files, key=lambda e: e.stat().st_mtime).path)
 
 
 @app.route('/api/apk/download/<filename>')
@@ -813,12 +1897,16 @@ def download_apk(filename):
     filepath = APK_FOLDER / secure_filename(filename)
     
     # Si le fichier existe localement, le servir
+    # ETag = checksum (déjà en cache pour le dernier APK) : 304 si inchangé
     if filepath.exists() and filepath.suffix == '.apk':
-        return send_file(
+        return send_local_file(
             filepath,
+            XACCEL_APKS_PREFIX,
             as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.android.package-archive'
+            download_name=filepath.name,
+            mimetype='application/vnd.android.package-archive',
+            etag=get_cached_checksum(filepath, load_apk_checksum),
+            max_age=APK_CACHE_MAX_AGE
         )
     
     # Sinon, rediriger vers IPFS si disponible
@@ -842,48 +1930,67 @@ def apk_qr_code():
     """
     
     # Récupérer les infos APK
-    result = get_latest_apk()
-    
-    # Gérer le cas où get_latest_apk retourne un tuple (response, status_code)
-    if isinstance(result, tuple):
-        # Erreur 404 - pas d'APK disponible
-        apk_info = result[0].get_json()
-        return jsonify(apk_info), 404
-    
-    apk_info = result.get_json()
-    
-    if 'error' in apk_info:
-        return jsonify(apk_info), 404
+    apk_info = get_latest_apk_info()
+    if apk_info is None:
+        return jsonify(create_api_error_response(
+            error_message="No APK available",
+            error_code=404
+        )), 404
     
     # Privilégier l'URL IPFS pour un accès décentralisé
     # Le QR code pointe directement vers IPFS si disponible
     if apk_info.get('ipfs_url'):
         download_url = apk_info['ipfs_url']
-        print(f'✅ QR code APK: URL IPFS utilisée: {download_url}')
+        app_logger.debug('QR code APK: URL IPFS utilisée: %s', download_url)
+        png = apk_qr_png(download_url, persist=True)
     else:
-        # Fallback: URL locale
+        # Fallback: URL locale, dérivée de l'en-tête Host fourni par le client :
+        # jamais écrite sur disque, seulement dans le cache mémoire borné
         base_url = request.host_url.rstrip('/')
         download_url = f"{base_url}{apk_info['download_url']}"
-        print(f'⚠️ QR code APK: URL locale utilisée (IPFS non disponible): {download_url}')
+        app_logger.debug('QR code APK: URL locale utilisée (IPFS non disponible): %s', download_url)
+        png = apk_qr_png(download_url, persist=False)
     
-    # Générer QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(download_url)
-    qr.make(fit=True)
+    return send_file(BytesIO(png), mimetype='image/png')
+
+
+@lru_cache(maxsize=16)
+def apk_qr_png(download_url, persist):
+    """
+    PNG du QR code APK pour une URL : mémoire du worker, puis (persist=True,
+    URL IPFS choisie par le serveur) cache disque partagé entre workers.
+    Un seul QR est gardé sur disque : celui du dernier APK publié.
+    """
+    if not persist:
+        return render_qr_png(download_url)
     
-    img = qr.make_image(fill_color="black", back_color="white")
+    url_key = hashlib.sha1(download_url.encode()).hexdigest()[:12]
+    cache_path = APK_FOLDER / f'.qr_{url_key}.png'
+    try:
+        return cache_path.read_bytes()
+    except FileNotFoundError:
+        pass
     
-    # Convertir en bytes
-    img_io = BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
+    png = render_qr_png(download_url)
     
-    return send_file(img_io, mimetype='image/png')
+    # Écriture atomique du cache disque (un autre worker peut le lire en même temps)
+    try:
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        app_logger.warning(f'Cache QR code APK non écrit: {e}')
+        return png
+    
+    # Nouvel APK (nouveau CID) : les QR des précédents ne servent plus
+    for old_path in APK_FOLDER.glob('.qr_*.png'):
+        if old_path != cache_path:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+    
+    return png
 
 
 @app.route('/api/nostr/register', methods=['POST'])
@@ -991,18 +2098,475 @@ def register_nostr_pubkey():
 
 # ==================== FEEDBACK GITHUB ====================
 
+# Mode différé (?async=1) : création de l'issue dans un thread, réponse 202
+FEEDBACK_MAX_PENDING = int(os.getenv('FEEDBACK_MAX_PENDING', '32'))
+FEEDBACK_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='gh_feedback')
+_FEEDBACK_SLOTS = threading.BoundedSemaphore(FEEDBACK_MAX_PENDING)
+
+# Feedbacks identiques (type+titre+description) regroupés sur une seule issue
+FEEDBACK_DEDUP_TTL = int(os.getenv('FEEDBACK_DEDUP_TTL', '60'))
+_FEEDBACK_RECENT = {}  # clé -> (expiration, issue_data)
+_FEEDBACK_RECENT_MAX = 512
+_FEEDBACK_INFLIGHT = {}  # clé -> threading.Event du premier envoi en cours
+_FEEDBACK_LOCK = threading.Lock()
+
+# Outbox disque : feedbacks que GitHub n'a pas pu prendre (panne, quota),
+# renvoyés avec un délai exponentiel (un fichier JSON par feedback)
+FEEDBACK_OUTBOX_BASE_DELAY = int(os.getenv('FEEDBACK_OUTBOX_BASE_DELAY', '30'))
+FEEDBACK_OUTBOX_MAX_ATTEMPTS = int(os.getenv('FEEDBACK_OUTBOX_MAX_ATTEMPTS', '12'))
+_FEEDBACK_OUTBOX_WAKE = threading.Event()
+_FEEDBACK_OUTBOX_WORKER = None
+_FEEDBACK_OUTBOX_LOCK = threading.Lock()
+
+# Statut des feedbacks répondus en 202 (GET /api/feedback/<feedback_id>),
+# sur disque pour être vu par tous les workers gunicorn
+FEEDBACK_RESULT_TTL = int(os.getenv('FEEDBACK_RESULT_TTL', '86400'))
+_FEEDBACK_RESULTS_PRUNE_AT = 0  # prochaine purge (monotonic), au plus une fois par heure
+
+
+# Emoji du titre d'issue selon le type de feedback
+FEEDBACK_TYPE_EMOJI = {
+    'bug': '🐛',
+    'feature': '✨',
+    'feedback': '💬',
+    'question': '❓'
+}
+
+# Limites GitHub : titre 256 caractères (emoji et type inclus), corps 65 536
+FEEDBACK_MAX_TITLE = 200
+FEEDBACK_MAX_DESCRIPTION = 60000
+FEEDBACK_MAX_META = 200  # email, app_version, platform (corps total < 65 536)
+
+# Corps de l'issue (str.format_map : la description n'est pas réinterprétée)
+FEEDBACK_ISSUE_BODY = """## Feedback Utilisateur
+
+**Type**: {type}
+**Version**: {version}
+**Plateforme**: {platform}
+**Email**: {email}
+**Date**: {date}
+
+---
+
+### Description
+
+{description}
+
+---
+
+*Ce feedback a été soumis automatiquement via l'application TrocZen.*
+"""
+
+_NOW_ISO = (0, '')  # (seconde, datetime ISO) partagé entre requêtes
+
+
+def now_iso_seconds() -> str:
+    """datetime.now().isoformat() à la seconde, formaté une fois par seconde"""
+    global _NOW_ISO
+    now = int(time.time())
+    cached = _NOW_ISO
+    if cached[0] != now:
+        cached = _NOW_ISO = (now, datetime.fromtimestamp(now).isoformat())
+    return cached[1]
+
+
+# Attente max (s) d'un token disponible ; au-delà le feedback part dans l'outbox (202)
+GITHUB_RATE_MAX_WAIT = float(os.getenv('GITHUB_RATE_MAX_WAIT', '5'))
+# Durée totale max (s) de création d'une issue (attente de quota, essais sur
+# chaque token), au-delà : outbox (202). Sous le timeout de 10 s de l'app
+# Flutter (feedback_service.dart), sinon le client abandonne avant la réponse
+GITHUB_DEADLINE = float(os.getenv('GITHUB_DEADLINE', '8'))
+
+_GITHUB_TOKEN_CYCLE = itertools.cycle(GITHUB_TOKENS)
+_GITHUB_TOKEN_RATE = {}  # token -> (X-RateLimit-Remaining, X-RateLimit-Reset)
+_GITHUB_TOKEN_LOCK = threading.Lock()
+
+
+class GitHubRateLimited(Exception):
+    """Tous les tokens GitHub sont à court de quota pour plus de GITHUB_RATE_MAX_WAIT"""
+    
+    def __init__(self, retry_after):
+        super().__init__(f'GitHub rate limit, retry after {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+def _github_token_reset(token, now):
+    """Timestamp jusqu'auquel le token est épuisé, 0 s'il est utilisable"""
+    remaining, reset = _GITHUB_TOKEN_RATE.get(token, (None, 0))
+    if remaining is None or remaining > 1 or reset <= now:
+        return 0
+    return reset
+
+
+def next_github_token():
+    """
+    Prochain token du pool (tourniquet), en sautant ceux dont le quota est
+    épuisé d'après les derniers en-têtes X-RateLimit-* reçus.
+    
+    Returns:
+        Tuple (token, attente) ; attente > 0 si tous les tokens sont épuisés
+        (celui qui se libère le plus tôt est renvoyé)
+    """
+    now = time.time()
+    with _GITHUB_TOKEN_LOCK:
+        for _ in range(len(GITHUB_TOKENS)):
+            token = next(_GITHUB_TOKEN_CYCLE)
+            if not _github_token_reset(token, now):
+                return token, 0
+        token = min(GITHUB_TOKENS, key=lambda t: _github_token_reset(t, now))
+        return token, _github_token_reset(token, now) - now
+
+
+def is_github_rate_limited(response):
+    """403 dû au quota (X-RateLimit-Remaining à 0 ou Retry-After), pas aux droits"""
+    headers = response.headers
+    return response.status_code == 403 and (
+        headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in headers
+    )
+
+
+def retry_after_seconds(value, default=60):
+    """Retry-After en secondes : nombre ou date HTTP, default si illisible"""
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def record_github_rate(token, response):
+    """Mémorise le quota restant du token (X-RateLimit-* ou Retry-After)"""
+    headers = response.headers
+    remaining = headers.get('X-RateLimit-Remaining')
+    if response.status_code in (403, 429) and headers.get('Retry-After'):
+        # Limite secondaire : pas de X-RateLimit-Remaining à 0
+        rate = (0, time.time() + retry_after_seconds(headers['Retry-After']))
+    elif remaining is not None:
+        try:
+            rate = (int(remaining), float(headers.get('X-RateLimit-Reset') or time.time() + 60))
+        except ValueError:
+            app_logger.warning(f'En-têtes X-RateLimit illisibles: {remaining!r}')
+            return
+    else:
+        return
+    with _GITHUB_TOKEN_LOCK:
+        _GITHUB_TOKEN_RATE[token] = rate
+
+
+def post_github_issue(payload, deadline=None):
+    """
+    POST d'une issue GitHub ; renvoie la réponse requests (lève RequestException).
+    Les tokens à quota épuisé sont évités avant l'envoi ; si tous le sont, on
+    attend jusqu'à GITHUB_RATE_MAX_WAIT secondes, sinon GitHubRateLimited.
+    Un refus pour quota fait repartir la requête avec le token suivant.
+    
+    Le tout tient avant deadline (time.monotonic(), par défaut dans
+    GITHUB_DEADLINE secondes) : sinon requests.Timeout.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + GITHUB_DEADLINE
+    # Encodé par le provider JSON de l'app (orjson si disponible) plutôt que
+    # par le json standard qu'utilise requests avec json=
+    body = app.json.dumps(payload).encode('utf-8')
+    
+    for _ in range(len(GITHUB_TOKENS)):
+        token, wait = next_github_token()
+        if wait > GITHUB_RATE_MAX_WAIT or wait + 1 > deadline - time.monotonic():
+            raise GitHubRateLimited(wait)
+        if wait > 0:
+            time.sleep(wait + random.uniform(0, 0.5))
+        
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            raise requests.exceptions.Timeout(f'Délai GitHub de {GITHUB_DEADLINE}s dépassé')
+        response = GITHUB_SESSION.post(
+            GITHUB_ISSUES_URL,
+            data=body,
+            headers={'Content-Type': 'application/json', 'Authorization': f'token {token}'},
+            timeout=(min(3.05, remaining), min(10, remaining))
+        )
+        record_github_rate(token, response)
+        if response.status_code not in (403, 429) or _github_token_reset(token, time.time()) == 0:
+            return response
+        
+        app_logger.warning(f'Quota GitHub épuisé pour un token ({response.status_code})')
+    
+    return response
+
+
+def created_issue(response):
+    """
+    Numéro et URL de l'issue si GitHub l'a créée (201), sinon None.
+    Décodé par le provider JSON de l'app (orjson si disponible) ; seuls ces
+    deux champs sont gardés, notamment dans le cache des feedbacks récents.
+    """
+    if response.status_code != 201:
+        return None
+    issue = app.json.loads(response.content)
+    return {'number': issue['number'], 'html_url': issue['html_url']}
+
+
+def _recent_feedback_issue(key):
+    """Issue créée récemment pour ce feedback, ou None (à appeler sous _FEEDBACK_LOCK)"""
+    entry = _FEEDBACK_RECENT.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return entry[1]
+
+
+def create_github_issue_once(key, payload):
+    """
+    Crée l'issue GitHub, sauf si un feedback identique a été traité il y a
+    moins de FEEDBACK_DEDUP_TTL secondes ou est en cours d'envoi : son issue
+    est alors réutilisée (rafale de rapports après un crash).
+    
+    Returns:
+        Tuple (issue_data, response) ; response vaut None si l'issue vient du
+        cache, issue_data vaut None si GitHub a refusé la création
+    """
+    # Un même délai pour l'attente du premier envoi et notre propre essai
+    deadline = time.monotonic() + GITHUB_DEADLINE
+    with _FEEDBACK_LOCK:
+        issue_data = _recent_feedback_issue(key)
+        if issue_data is not None:
+            return issue_data, None
+        event = _FEEDBACK_INFLIGHT.get(key)
+        leader = event is None
+        if leader:
+            event = _FEEDBACK_INFLIGHT[key] = threading.Event()
+    
+    if not leader:
+        event.wait(timeout=max(deadline - time.monotonic(), 0))
+        with _FEEDBACK_LOCK:
+            issue_data = _recent_feedback_issue(key)
+        if issue_data is not None:
+            return issue_data, None
+        # Le premier envoi a échoué : on tente le nôtre
+        response = post_github_issue(payload, deadline)
+        return created_issue(response), response
+    
+    try:
+        response = post_github_issue(payload, deadline)
+        issue_data = created_issue(response)
+        if issue_data is not None:
+            with _FEEDBACK_LOCK:
+                _FEEDBACK_RECENT[key] = (time.monotonic() + FEEDBACK_DEDUP_TTL, issue_data)
+                while len(_FEEDBACK_RECENT) > _FEEDBACK_RECENT_MAX:
+                    _FEEDBACK_RECENT.pop(next(iter(_FEEDBACK_RECENT)))
+        return issue_data, response
+    finally:
+        with _FEEDBACK_LOCK:
+            _FEEDBACK_INFLIGHT.pop(key, None)
+        event.set()
+
+
+def send_feedback_issue(key, payload):
+    """
+    Crée l'issue et classe l'échec éventuel.
+    
+    Returns:
+        Tuple (issue_data, retry_in) : issue_data si l'issue existe ; sinon
+        retry_in (secondes) si l'échec est temporaire (réseau, 5xx, quota),
+        None si GitHub a refusé le feedback lui-même
+    """
+    try:
+        issue_data, response = create_github_issue_once(key, payload)
+    except GitHubRateLimited as e:
+        app_logger.warning(f"Feedback différé: {e}")
+        return None, e.retry_after
+    except requests.exceptions.RequestException as e:
+        app_logger.error(f"Erreur connexion GitHub: {format_error_for_log(e)}")
+        return None, 0
+    
+    if issue_data is not None:
+        return issue_data, None
+    app_logger.error(f"Erreur GitHub API: {response.status_code} - {response.text}")
+    if response.status_code >= 500 or response.status_code == 429 or is_github_rate_limited(response):
+        return None, 0
+    # 403 sans en-tête de quota : droits ou scope du token, inutile de réessayer
+    return None, None
+
+
+def _prune_feedback_results():
+    """Supprime les statuts de feedback de plus de FEEDBACK_RESULT_TTL secondes"""
+    expired = time.time() - FEEDBACK_RESULT_TTL
+    for old in FEEDBACK_RESULTS.glob('*.json'):
+        try:
+            if old.stat().st_mtime < expired:
+                old.unlink()
+        except OSError:
+            pass
+
+
+def record_feedback_status(key, status, issue_data=None):
+    """
+    Enregistre le statut d'un feedback différé : 'pending', 'created' ou
+    'failed'. Les statuts de plus de FEEDBACK_RESULT_TTL secondes sont purgés
+    au plus une fois par heure, pas à chaque écriture.
+    """
+    global _FEEDBACK_RESULTS_PRUNE_AT
+    
+    with _FEEDBACK_LOCK:
+        prune = _FEEDBACK_RESULTS_PRUNE_AT <= time.monotonic()
+        if prune:
+            _FEEDBACK_RESULTS_PRUNE_AT = time.monotonic() + min(3600, FEEDBACK_RESULT_TTL)
+    if prune:
+        _prune_feedback_results()
+    
+    entry = {'status': status}
+    if issue_data is not None:
+        entry['issue_number'] = issue_data['number']
+        entry['issue_url'] = issue_data['html_url']
+    path = FEEDBACK_RESULTS / f'{key}.json'
+    tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_text(app.json.dumps(entry))
+    os.replace(tmp_path, path)
+
+
+def start_feedback_outbox():
+    """Démarre (une fois) le thread de renvoi de l'outbox et le réveille"""
+    global _FEEDBACK_OUTBOX_WORKER
+    
+    with _FEEDBACK_OUTBOX_LOCK:
+        if _FEEDBACK_OUTBOX_WORKER is None:
+            _FEEDBACK_OUTBOX_WORKER = threading.Thread(target=_feedback_outbox_loop, name='gh_outbox', daemon=True)
+            _FEEDBACK_OUTBOX_WORKER.start()
+    _FEEDBACK_OUTBOX_WAKE.set()
+
+
+def outbox_feedback(key, payload, delay=0, attempts=0, path=None):
+    """Écrit (ou réécrit) un feedback dans l'outbox, renvoyé après delay secondes"""
+    delay = max(delay, FEEDBACK_OUTBOX_BASE_DELAY)
+    path = path or FEEDBACK_OUTBOX / f'{time.time_ns()}-{key[:12]}.json'
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text(app.json.dumps({
+        'key': key,
+        'payload': payload,
+        'attempts': attempts,
+        'next_try': time.time() + delay
+    }))
+    os.replace(tmp_path, path)
+    record_feedback_status(key, 'pending')
+    start_feedback_outbox()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _drain_feedback_outbox():
+    """
+    Un passage sur l'outbox ; renvoie le délai avant la prochaine échéance.
+    Chaque fichier est réservé par rename en <nom>.json.<pid> : un seul
+    worker gunicorn l'envoie. Les réservations d'un worker mort sont rendues.
+    """
+    for claim in FEEDBACK_OUTBOX.glob('*.json.*'):
+        pid = claim.suffix[1:]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            os.replace(claim, claim.with_suffix(''))
+    
+    next_due = FEEDBACK_OUTBOX_BASE_DELAY
+    for path in sorted(FEEDBACK_OUTBOX.glob('*.json')):
+        try:
+            with open(path, 'r') as f:
+                entry = app.json.loads(f.read())
+            key, payload = entry['key'], entry['payload']
+        except OSError:
+            continue
+        except (ValueError, KeyError, TypeError):
+            # Fichier illisible : écarté pour inspection, ne bloque pas les autres
+            app_logger.error(f'Entrée outbox invalide: {path.name}')
+            os.replace(path, path.with_suffix('.failed'))
+            continue
+        wait = entry.get('next_try', 0) - time.time()
+        if wait > 0:
+            next_due = min(next_due, wait)
+            continue
+        
+        claim = path.with_name(f'{path.name}.{os.getpid()}')
+        try:
+            os.rename(path, claim)
+        except OSError:
+            continue  # Pris par un autre worker
+        
+        try:
+            issue_data, retry_in = send_feedback_issue(key, payload)
+        except Exception as e:
+            # Réservation rendue : sinon le fichier resterait pris par ce
+            # worker (vivant) jusqu'à son redémarrage
+            app_logger.error(f"Erreur envoi outbox {path.name}: {format_error_for_log(e)}")
+            os.replace(claim, path)
+            continue
+        attempts = entry.get('attempts', 0) + 1
+        if issue_data is not None:
+            app_logger.info(f"Issue GitHub créée depuis l'outbox: #{issue_data['number']}")
+            record_feedback_status(key, 'created', issue_data)
+            claim.unlink(missing_ok=True)
+        elif retry_in is not None and attempts < FEEDBACK_OUTBOX_MAX_ATTEMPTS:
+            delay = max(retry_in, min(FEEDBACK_OUTBOX_BASE_DELAY * 2 ** attempts, 3600))
+            outbox_feedback(key, payload, delay, attempts, path)
+            claim.unlink(missing_ok=True)
+            next_due = min(next_due, delay)
+        else:
+            # Conservé pour inspection manuelle, plus jamais renvoyé
+            app_logger.error(f'Feedback abandonné après {attempts} essai(s): {path.name}')
+            os.replace(claim, path.with_suffix('.failed'))
+            record_feedback_status(key, 'failed')
+    return next_due
+
+
+def _feedback_outbox_loop():
+    """Thread de renvoi de l'outbox (réveillé par outbox_feedback)"""
+    while True:
+        try:
+            wait = _drain_feedback_outbox()
+        except Exception as e:
+            app_logger.error(f"Erreur outbox feedback: {format_error_for_log(e)}")
+            wait = FEEDBACK_OUTBOX_BASE_DELAY
+        _FEEDBACK_OUTBOX_WAKE.wait(timeout=max(wait, 1))
+        _FEEDBACK_OUTBOX_WAKE.clear()
+
+
+def _post_github_issue_background(key, payload):
+    """Création d'issue hors requête : résultat via GET /api/feedback/<feedback_id>"""
+    try:
+        issue_data, retry_in = send_feedback_issue(key, payload)
+        if issue_data is not None:
+            app_logger.info(f"Issue GitHub (différée): #{issue_data['number']}")
+            record_feedback_status(key, 'created', issue_data)
+        elif retry_in is not None:
+            outbox_feedback(key, payload, retry_in)
+        else:
+            record_feedback_status(key, 'failed')
+    except Exception as e:
+        app_logger.error(f"Erreur feedback différé: {format_error_for_log(e)}")
+    finally:
+        _FEEDBACK_SLOTS.release()
+
+
 @app.route('/api/feedback', methods=['POST'])
 def submit_feedback():
     """
     Soumettre un feedback utilisateur vers GitHub Issues
     🔒 Sécurisé: Le token GitHub reste côté serveur (.env)
-    """
     
-    # Configuration GitHub
-    GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
-    GITHUB_REPO = os.getenv('GITHUB_REPO', 'papiche/troczen')
-    
-    if not GITHUB_TOKEN:
+    Par défaut l'issue est créée avant de répondre (201 + issue_number).
+    Avec ?async=1, l'issue est mise en file et la réponse est 202 immédiate
+    (sans issue_number) ; si la file est pleine, on repasse en synchrone.
+    Si GitHub est injoignable ou à court de quota, le feedback part dans
+    l'outbox disque (202) au lieu d'être perdu. Une réponse 202 contient un
+    feedback_id pour suivre la création via GET /api/feedback/<feedback_id>.
+    """
+    if not GITHUB_TOKENS:
         return jsonify({
             'success': False,
             'error': 'GitHub integration not configured on server'
@@ -1017,50 +2581,45 @@ def submit_feedback():
     title = data.get('title', '')
     description = data.get('description', '')
     feedback_type = data.get('type', 'feedback')  # bug, feature, feedback
-    user_email = data.get('email', 'anonymous')
-    app_version = data.get('app_version', 'unknown')
-    platform = data.get('platform', 'unknown')
+    user_email = data.get('email') or 'anonymous'
+    app_version = data.get('app_version') or 'unknown'
+    platform = data.get('platform') or 'unknown'
     
     if not title or not description:
         return jsonify({'error': 'Title and description are required'}), 400
     
+    # Refuser avant toute mise en forme ce que GitHub rejetterait de toute façon
+    if not isinstance(title, str) or not isinstance(description, str):
+        return jsonify({'error': 'Title and description must be strings'}), 400
+    
+    if not isinstance(feedback_type, str) or feedback_type not in FEEDBACK_TYPE_EMOJI:
+        return jsonify({'error': f'Invalid feedback type: {feedback_type}'}), 400
+    
+    if len(title) > FEEDBACK_MAX_TITLE or len(description) > FEEDBACK_MAX_DESCRIPTION:
+        return jsonify({
+            'error': f'Title ({FEEDBACK_MAX_TITLE}) or description ({FEEDBACK_MAX_DESCRIPTION}) too long'
+        }), 413
+    
+    # Les autres champs du corps de l'issue : mêmes contrôles
+    for field, value in (('email', user_email), ('app_version', app_version), ('platform', platform)):
+        if not isinstance(value, str):
+            return jsonify({'error': f'{field} must be a string'}), 400
+        if len(value) > FEEDBACK_MAX_META:
+            return jsonify({'error': f'{field} too long ({FEEDBACK_MAX_META})'}), 413
+    
     # Formater le titre avec emoji selon le type
-    type_emoji = {
-        'bug': '🐛',
-        'feature': '✨',
-        'feedback': '💬',
-        'question': '❓'
-    }
-    emoji = type_emoji.get(feedback_type, '💬')
+    emoji = FEEDBACK_TYPE_EMOJI[feedback_type]
     issue_title = f"{emoji} [{feedback_type.upper()}] {title}"
     
     # Formater le corps de l'issue
-    issue_body = f"""## Feedback Utilisateur
-
-**Type**: {feedback_type}
-**Version**: {app_version}
-**Plateforme**: {platform}
-**Email**: {user_email}
-**Date**: {datetime.now().isoformat()}
-
----
-
-### Description
-
-{description}
-
----
-
-*Ce feedback a été soumis automatiquement via l'application TrocZen.*
-"""
-    
-    # Préparer la requête GitHub
-    github_api_url = f'https://api.github.com/repos/{GITHUB_REPO}/issues'
-    headers = {
-        'Authorization': f'token {GITHUB_TOKEN}',
-        'Accept': 'application/vnd.github.v3+json',
-        'Content-Type': 'application/json'
-    }
+    issue_body = FEEDBACK_ISSUE_BODY.format_map({
+        'type': feedback_type,
+        'version': app_version,
+        'platform': platform,
+        'email': user_email,
+        'date': now_iso_seconds(),
+        'description': description
+    })
     
     # Labels selon le type
     labels = [feedback_type]
@@ -1073,18 +2632,27 @@ def submit_feedback():
         'labels': labels
     }
     
+    feedback_key = hashlib.sha256(f'{feedback_type}|{title}|{description}'.encode('utf-8')).hexdigest()
+    
+    if request.args.get('async') == '1' and _FEEDBACK_SLOTS.acquire(blocking=False):
+        try:
+            record_feedback_status(feedback_key, 'pending')
+        except OSError as e:
+            app_logger.warning(f"Statut feedback non enregistré: {e}")
+        FEEDBACK_EXECUTOR.submit(_post_github_issue_background, feedback_key, payload)
+        return jsonify({
+            'success': True,
+            'status': 'queued',
+            'feedback_id': feedback_key,
+            'message': 'Feedback reçu, création de l\'issue en cours'
+        }), 202
+    
     try:
         # Envoyer vers GitHub
-        response = requests.post(
-            github_api_url,
-            headers=headers,
-            json=payload,
-            timeout=10
-        )
+        issue_data, retry_in = send_feedback_issue(feedback_key, payload)
         
-        if response.status_code == 201:
-            issue_data = response.json()
-            app_logger.info(f"Issue GitHub créée: #{issue_data['number']}")
+        if issue_data is not None:
+            app_logger.info(f"Issue GitHub: #{issue_data['number']}")
             
             return jsonify({
                 'success': True,
@@ -1092,19 +2660,20 @@ def submit_feedback():
                 'issue_number': issue_data['number'],
                 'issue_url': issue_data['html_url']
             }), 201
+        elif retry_in is not None:
+            outbox_feedback(feedback_key, payload, retry_in)
+            return jsonify({
+                'success': True,
+                'status': 'queued',
+                'feedback_id': feedback_key,
+                'message': 'GitHub indisponible, feedback conservé et renvoyé automatiquement'
+            }), 202
         else:
-            app_logger.error(f"Erreur GitHub API: {response.status_code} - {response.text}")
             return jsonify({
                 'success': False,
                 'error': 'GitHub API error'
             }), 500
             
-    except requests.exceptions.RequestException as e:
-        app_logger.error(f"Erreur connexion GitHub: {format_error_for_log(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Failed to connect to GitHub'
-        }), 500
     except Exception as e:
         app_logger.error(f"Erreur feedback: {format_error_for_log(e)}")
         return jsonify({
@@ -1113,6 +2682,28 @@ def submit_feedback():
         }), 500
 
 
+@app.route('/api/feedback/<feedback_id>', methods=['GET'])
+def get_feedback_status(feedback_id):
+    """
+    Statut d'un feedback répondu en 202 : 'pending' (en file ou dans
+    l'outbox), 'created' (avec issue_number et issue_url) ou 'failed'.
+    """
+    if len(feedback_id) != 64 or not all(c in '0123456789abcdef' for c in feedback_id):
+        return jsonify({'error': 'Invalid feedback id'}), 400
+    
+    try:
+        with open(FEEDBACK_RESULTS / f'{feedback_id}.json', 'r') as f:
+            entry = app.json.loads(f.read())
+    except FileNotFoundError:
+        return jsonify({'error': 'Unknown feedback id'}), 404
+    
+    return jsonify({'success': True, 'feedback_id': feedback_id, **entry})
+
+# Reprendre au démarrage les feedbacks laissés dans l'outbox
+if GITHUB_TOKENS and any(FEEDBACK_OUTBOX.glob('*.json*')):
+    start_feedback_outbox()
+
+
 if __name__ == '__main__':
-    # Mode dev
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Mode dev (débogueur et rechargement désactivés si PRODUCTION=true)
+    app.run(host='0.0.0.0', port=5000, debug=not is_production)
@@ -21,8 +21,10 @@ Usage:
     logger.error("Message d'erreur", exc_info=True)
 """
 
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -43,6 +45,18 @@ DEFAULT_LOG_LEVEL = logging.INFO
 DEFAULT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 DEFAULT_LOG_FORMAT_DETAILED = '%(asctime)s - %(name)s - %(levelname)s - %(message)s\n%(pathname)s:%(lineno)d\n%(exc_info)s'
 
+# Thread d'écriture des logs (QueueListener), un seul par processus
+_queue_listener = None
+_queue_listener_atexit = False
+
+
+def _stop_queue_listener():
+    """Arrête le QueueListener s'il tourne (stop() deux fois lève avant Python 3.12)"""
+    global _queue_listener
+    if _queue_listener is not None:
+        listener, _queue_listener = _queue_listener, None
+        listener.stop()
+
 
 def setup_logging(
     log_level: str = None,
@@ -50,7 +64,8 @@ def setup_logging(
     max_file_size: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
     console_output: bool = True,
-    production_mode: bool = False
+    production_mode: bool = False,
+    use_queue: bool = True
 ) -> logging.Logger:
     """
     Configure le système de logging pour l'application.
@@ -62,6 +77,8 @@ def setup_logging(
         backup_count: Nombre de fichiers de log à conserver
         console_output: Si True, affiche les logs dans la console
         production_mode: Si True, utilise un format plus compact pour la production
+        use_queue: Si True, les requêtes ne font que déposer les logs dans une
+                   file ; l'écriture (stdout, fichier) se fait dans un thread dédié
     
     Returns:
         Logger configuré pour l'application
@@ -80,6 +97,8 @@ def setup_logging(
     
     level = level_map.get(log_level, logging.INFO)
     
+    global _queue_listener, _queue_listener_atexit
+    
     # Créer le logger racine
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
@@ -88,6 +107,8 @@ def setup_logging(
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
+    handlers = []
+    
     # Formateur
     if production_mode:
         formatter = logging.Formatter(
@@ -105,7 +126,7 @@ def setup_logging(
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(level)
         console_handler.setFormatter(formatter)
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
     
     # Handler fichier (si spécifié)
     if log_file:
@@ -121,8 +142,31 @@ def setup_logging(
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
-        
+        handlers.append(file_handler)
+    
+    if use_queue and handlers:
+        # Les workers ne se disputent plus le verrou de stdout/du fichier
+        if _queue_listener is None:
+            _queue_listener = logging.handlers.QueueListener(
+                queue.SimpleQueue(), *handlers, respect_handler_level=True
+            )
+            _queue_listener.start()
+            if not _queue_listener_atexit:
+                atexit.register(_stop_queue_listener)
+                _queue_listener_atexit = True
+        else:
+            # Reconfiguration : même thread d'écriture, nouveaux handlers
+            old_handlers = _queue_listener.handlers
+            _queue_listener.handlers = tuple(handlers)
+            for handler in old_handlers:
+                handler.close()
+        root_logger.addHandler(logging.handlers.QueueHandler(_queue_listener.queue))
+    else:
+        _stop_queue_listener()
+        for handler in handlers:
+            root_logger.addHandler(handler)
+    
+    if log_file:
         # Log de confirmation
         root_logger.info(f"Logging configuré vers le fichier: {log_file}")
     
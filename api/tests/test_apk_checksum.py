@@ -0,0 +1,52 @@
+"""Checksums APK : empreinte arbre au-delà de TREE_CHECKSUM_MIN_SIZE, sans fork"""
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('IPFS_ENABLED', 'false')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import api_backend  # noqa: E402
+
+
+class TreeChecksumTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.apk = Path(self.tmp.name) / 'troczen.apk'
+        # 3 tranches pleines et une partielle avec 4 cœurs
+        self.content = os.urandom(3 * mmap.ALLOCATIONGRANULARITY + 100)
+        self.apk.write_bytes(self.content)
+        self._saved = (api_backend.TREE_CHECKSUM_MIN_SIZE, api_backend.APK_CHECKSUM_ALGO)
+        api_backend.TREE_CHECKSUM_MIN_SIZE = 1024
+        api_backend.APK_CHECKSUM_ALGO = 'sha256'
+
+    def tearDown(self):
+        api_backend.TREE_CHECKSUM_MIN_SIZE, api_backend.APK_CHECKSUM_ALGO = self._saved
+        self.tmp.cleanup()
+
+    def test_tree_checksum_above_threshold(self):
+        step = mmap.ALLOCATIONGRANULARITY
+        parts = b''.join(hashlib.sha256(self.content[off:off + step]).digest()
+                         for off in range(0, len(self.content), step))
+        expected = api_backend.TREE_CHECKSUM_PREFIX + hashlib.sha256(parts).hexdigest()
+
+        with mock.patch('os.cpu_count', return_value=4), \
+                mock.patch.object(concurrent.futures, 'ProcessPoolExecutor',
+                                  side_effect=AssertionError('fork dans un worker gevent')):
+            self.assertEqual(api_backend.generate_apk_checksum(self.apk), expected)
+
+    def test_plain_sha256_below_threshold(self):
+        api_backend.TREE_CHECKSUM_MIN_SIZE = len(self.content) + 1
+        self.assertEqual(api_backend.generate_apk_checksum(self.apk),
+                         hashlib.sha256(self.content).hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
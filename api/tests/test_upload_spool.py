@@ -0,0 +1,76 @@
+"""Uploads multipart : aucun fichier ne doit rester si le corps est tronqué"""
+import gc
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from werkzeug.test import EnvironBuilder
+
+os.environ.setdefault('IPFS_ENABLED', 'false')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import api_backend  # noqa: E402
+
+PNG = b'\x89PNG\r\n\x1a\n' + os.urandom(200000)
+
+
+class UploadSpoolTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.uploads = Path(self.tmp.name) / 'uploads'
+        self.spool = Path(self.tmp.name) / 'spool'
+        self.uploads.mkdir()
+        self.spool.mkdir()
+        self._saved = (api_backend.UPLOAD_FOLDER, api_backend.UPLOAD_SPOOL)
+        api_backend.UPLOAD_FOLDER, api_backend.UPLOAD_SPOOL = self.uploads, self.spool
+        self.client = api_backend.app.test_client()
+    
+    def tearDown(self):
+        api_backend.UPLOAD_FOLDER, api_backend.UPLOAD_SPOOL = self._saved
+        self.tmp.cleanup()
+    
+    def leftovers(self):
+        gc.collect()
+        return sorted(os.listdir(self.uploads)) + sorted(os.listdir(self.spool))
+    
+    def test_upload_is_kept(self):
+        response = self.client.post('/api/upload/image', data={
+            'file': (io.BytesIO(PNG), 'logo.png'),
+            'npub': 'npub1abcdefghijklmnop',
+            'type': 'logo',
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(os.listdir(self.spool), [])
+        filename = response.get_json()['filename']
+        self.assertEqual((self.uploads / filename).read_bytes(), PNG)
+    
+    def test_aborted_upload_leaves_no_file(self):
+        builder = EnvironBuilder(method='POST', path='/api/upload/image', data={
+            'file': (io.BytesIO(PNG), 'logo.png'),
+            'npub': 'npub1abcdefghijklmnop',
+        })
+        environ = builder.get_environ()
+        body = environ['wsgi.input'].read()
+        # Client déconnecté au milieu du fichier : Content-Length annonce tout le corps
+        environ['wsgi.input'] = io.BytesIO(body[:len(body) // 2])
+        
+        response = self.client.open(environ)
+        self.assertGreaterEqual(response.status_code, 400)
+        response.close()
+        self.assertEqual(self.leftovers(), [])
+    
+    def test_rejected_upload_leaves_no_file(self):
+        response = self.client.post('/api/upload/image', data={
+            'file': (io.BytesIO(b'GIF89a' + b'\0' * 100), 'logo.png'),
+            'npub': 'npub1abcdefghijklmnop',
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.leftovers(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -126,6 +126,11 @@ mkdir -p "$DEST_DIR"
 # Copier l'APK avec le bon nom
 cp "$APK_SRC" "$DEST_DIR/$APK_NAME"
 
+# Pointeur vers la dernière version (lu par /api/apk/latest sans lister le dossier)
+# Remplacement atomique du lien : l'API ne voit jamais de lien absent
+ln -sfn "$APK_NAME" "$DEST_DIR/.latest.apk.tmp"
+mv -Tf "$DEST_DIR/.latest.apk.tmp" "$DEST_DIR/latest.apk"
+
 echo "✅ APK built: $APK_NAME"
 echo "✅ Placed in $DEST_DIR/$APK_NAME"
 
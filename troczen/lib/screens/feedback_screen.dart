@@ -62,7 +62,9 @@ class _FeedbackScreenState extends State<FeedbackScreen> {
 
       // Afficher résultat
       if (result.success) {
-        _showSuccess('✅ Feedback envoyé avec succès!\nIssue #${result.issueNumber}');
+        _showSuccess(result.issueNumber != null
+            ? '✅ Feedback envoyé avec succès!\nIssue #${result.issueNumber}'
+            : '✅ Feedback reçu, il sera transmis dès que possible.');
         Navigator.pop(context);
       } else {
         _showError(result.error ?? 'Échec d\'envoi. Vérifiez votre connexion.');
@@ -111,7 +111,9 @@ $logsSection
         }),
       ).timeout(const Duration(seconds: 10));
 
-      if (response.statusCode == 201) {
+      // 201 : issue créée ; 202 : feedback accepté, issue créée plus tard
+      // (GitHub indisponible ou à court de quota), sans issue_number
+      if (response.statusCode == 201 || response.statusCode == 202) {
         final data = jsonDecode(response.body);
         return FeedbackResult(
           success: true,
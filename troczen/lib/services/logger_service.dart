@@ -133,7 +133,9 @@ class Logger {
       );
       
       if (result.success) {
-        success('Logger', 'Logs transmis avec succès - Issue #${result.issueNumber}');
+        success('Logger', result.issueNumber != null
+            ? 'Logs transmis avec succès - Issue #${result.issueNumber}'
+            : 'Logs reçus par le serveur, issue créée dès que possible');
         return true;
       } else {
         error('Logger', 'Échec de transmission des logs', result.error);